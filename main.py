@@ -1,5 +1,23 @@
+import argparse
+
 from utils.trade import Trader
 
 if __name__ == '__main__':
-    alpha = Trader()
-    alpha.run()
+    parser = argparse.ArgumentParser(description="Trading bot, playing one game on standard input by default")
+    parser.add_argument('--serve', action='store_true', help="host many games over TCP or a Unix socket")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--socket', help="Unix socket path, used instead of TCP")
+    parser.add_argument('--predictor', choices=('regression', 'rls', 'kalman'), default='regression')
+    parser.add_argument('--workers', type=int, default=0,
+                        help="strategy worker processes fed through shared memory, 0 to decide in process")
+    args = parser.parse_args()
+    if args.serve and args.workers:
+        parser.error("--workers is not supported with --serve, whose games run in one process")
+
+    if args.serve:
+        from utils.server import BotServer
+        BotServer(args.host, args.port, args.socket, args.predictor).run()
+    else:
+        alpha = Trader(predictor=args.predictor, workers=args.workers)
+        alpha.run()
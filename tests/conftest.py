@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+from utils.dataset import COLUMNS, load_candles
+
+DATASETS = os.path.join(os.path.dirname(__file__), '..', 'datasets')
+
+
+@pytest.fixture
+def game():
+    """Build the protocol lines of a game, one dataset per pair, with constant stacks."""
+    def build(sources, turns=40, given=337, fee_percent=0.2):
+        candles = {pair: load_candles(os.path.join(DATASETS, dataset))['USDT_BTC'] for pair, dataset in sources.items()}
+
+        def row(pair, i):
+            return ','.join([pair] + ['%r' % candles[pair][column][i] for column in COLUMNS])
+
+        stacks = ','.join(['USDT:1000.0'] + [f'{pair.split("_")[1]}:0.01' for pair in sources])
+        lines = [f'settings transaction_fee_percent {fee_percent}', 'settings initial_stack 1000',
+                 'update game next_candles ' + ';'.join(row(pair, i) for i in range(given) for pair in sources)]
+        for i in range(given, given + turns):
+            lines.append('update game next_candles ' + ';'.join(row(pair, i) for pair in sources))
+            lines.append(f'update game stacks {stacks}')
+            lines.append('action order')
+        return lines
+    return build
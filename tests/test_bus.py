@@ -0,0 +1,61 @@
+import io
+
+import pytest
+
+from utils.bus import CandleBus
+from utils.market import MarketData
+from utils.trade import Trader
+
+CANDLE = (1622548800.0, 36597.26, 36112.01, 36596.63, 36164.95, 122194005.0)
+REQUEST = ('USDT_BTC', 1000.0, 0.0, 1000.0)
+
+
+class Broken(MarketData):
+    def buy_or_sell_signal(self, pair, buy_stack, sell_stack, asset):
+        raise ZeroDivisionError("broken strategy")
+
+
+def play(lines, workers):
+    output = io.StringIO()
+    trader = Trader(output=output, workers=workers)
+    try:
+        for line in lines:
+            trader.parse(line)
+    finally:
+        if trader.bus is not None:
+            trader.bus.close()
+    return output.getvalue()
+
+
+def test_workers_take_the_in_process_decisions(game):
+    lines = game({'USDT_BTC': 'test1.csv', 'USDT_ETH': 'test2.csv', 'USDT_XRP': 'test3.csv',
+                  'USDT_LTC': 'test4.csv'}, turns=150)
+    expected = play(lines, 0)
+    assert expected.count('\n') == 4 * 150
+    assert play(lines, 2) == expected
+
+
+@pytest.mark.parametrize('isolated', [False, True])
+def test_strategy_exception_is_raised_by_decide(isolated):
+    bus = CandleBus(2, strategy=Broken, isolated=isolated)
+    try:
+        bus.publish('USDT_BTC', CANDLE)
+        with pytest.raises(RuntimeError, match='broken strategy'):
+            bus.decide([REQUEST])
+        # the worker survives and keeps answering
+        with pytest.raises(RuntimeError, match='broken strategy'):
+            bus.decide([REQUEST])
+    finally:
+        bus.close()
+
+
+def test_overwritten_candles_are_skipped():
+    bus = CandleBus(1, capacity=8)
+    try:
+        for _ in range(20):
+            bus.publish('USDT_BTC', CANDLE)
+        assert bus.decide([REQUEST]) == ['no_moves\n']
+        bus.publish('USDT_BTC', CANDLE)
+        assert bus.decide([REQUEST]) == ['no_moves\n']
+    finally:
+        bus.close()
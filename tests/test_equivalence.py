@@ -0,0 +1,19 @@
+import os
+
+from utils.equivalence import compare
+
+DATASETS = os.path.join(os.path.dirname(__file__), '..', 'datasets')
+
+
+def test_bounded_market_data_matches_reference():
+    path, compared, report = compare(os.path.join(DATASETS, 'test1.csv'))
+    assert report is None
+    assert compared == 1692
+
+
+def test_engine_exception_is_reported_as_divergence():
+    # the reference fails before the ADX is defined, the bounded engine makes no move
+    _, compared, report = compare(os.path.join(DATASETS, 'test1.csv'), start=100)
+    assert compared == 1
+    assert 'TypeError' in report
+    assert "'no_moves'" in report
@@ -0,0 +1,42 @@
+import os
+import time
+
+from utils.features import STALE, FeatureStore
+
+SOURCE = 'ab' * 32
+
+
+def test_round_trip(tmp_path):
+    store = FeatureStore(str(tmp_path))
+    store.save(SOURCE, 'smma', {'period': 50}, {'smma': [1.0, 2.0], 'smma_prev': [0.5, 1.0]})
+    columns = store.load(SOURCE, 'smma', {'period': 50})
+    assert list(columns['smma']) == [1.0, 2.0]
+    assert list(columns['smma_prev']) == [0.5, 1.0]
+    assert store.load(SOURCE, 'smma', {'period': 20}) is None
+
+
+def test_short_or_foreign_files_are_misses(tmp_path):
+    store = FeatureStore(str(tmp_path))
+    store.save(SOURCE, 'smma', {'period': 50}, {'smma': [1.0, 2.0]})
+    path = store.filename(SOURCE, 'smma', {'period': 50})
+    content = open(path, 'rb').read()
+    for corrupt in (b'FEAT', b'not a feature file at all, but long enough', content[:-8]):
+        with open(path, 'wb') as file:
+            file.write(corrupt)
+        assert store.load(SOURCE, 'smma', {'period': 50}) is None
+
+
+def test_eviction_counts_and_removes_stale_temporary_files(tmp_path):
+    store = FeatureStore(str(tmp_path), max_bytes=4096)
+    stale = tmp_path / 'killed.tmp'
+    stale.write_bytes(bytes(8192))
+    old = time.time() - STALE - 1
+    os.utime(stale, (old, old))
+    fresh = tmp_path / 'writing.tmp'
+    fresh.write_bytes(bytes(2048))
+    store.save(SOURCE, 'smma', {'period': 50}, {'smma': [1.0] * 200})
+    store.save(SOURCE, 'smma', {'period': 20}, {'smma': [1.0] * 200})
+    assert not stale.exists()
+    assert fresh.exists()
+    # the write in progress leaves room for one entry only
+    assert len([name for name in os.listdir(tmp_path) if name.endswith('.col')]) == 1
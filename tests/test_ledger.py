@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+from utils.dataset import load_candles
+from utils.equivalence import Replay
+from utils.ledger import Ledger
+from utils.market import MarketData
+
+DATASETS = os.path.join(os.path.dirname(__file__), '..', 'datasets')
+
+
+def game_equity(dollars, coins, price):
+    return dollars + coins * price
+
+
+def test_round_trip_closes_position():
+    ledger = Ledger(fee_percent=0.2)
+    ledger.fill('USDT_BTC', 'buy', 1.0, 100.0)
+    # the game delivered 0.998 coins, selling them all leaves nothing open
+    ledger.fill('USDT_BTC', 'sell', 0.998, 110.0)
+    position = ledger.position('USDT_BTC')
+    assert position.quantity == 0
+    assert position.return_ratio is None
+    assert position.unrealized_pnl == 0
+    assert position.realized_pnl == pytest.approx(10 * 0.998)
+    ledger.mark('USDT_BTC', 500.0)
+    assert ledger.unrealized_pnl == 0
+
+
+def test_total_pnl_matches_game_stacks():
+    ledger = Ledger(fee_percent=0.2)
+    dollars, coins = 1000.0, 0.0
+    start = game_equity(dollars, coins, 100.0)
+
+    ledger.fill('USDT_BTC', 'buy', 10.0, 100.0)
+    dollars, coins = dollars - 10.0 * 100.0, coins + 10.0 * 0.998
+    for price in (90.0, 120.0):
+        ledger.mark('USDT_BTC', price)
+        assert ledger.total_pnl == pytest.approx(game_equity(dollars, coins, price) - start)
+
+    ledger.fill('USDT_BTC', 'sell', coins, 120.0)
+    dollars, coins = dollars + coins * 120.0 * 0.998, 0.0
+    assert ledger.total_pnl == pytest.approx(game_equity(dollars, coins, 120.0) - start)
+    assert ledger.fees == pytest.approx(10.0 * 100.0 * 0.002 + 9.98 * 120.0 * 0.002)
+
+
+def test_drawdown_follows_total_pnl():
+    ledger = Ledger()
+    ledger.fill('USDT_BTC', 'buy', 1.0, 100.0)
+    ledger.mark('USDT_BTC', 150.0)
+    ledger.mark('USDT_BTC', 120.0)
+    assert ledger.high_water_mark == 50.0
+    assert ledger.drawdown == 30.0
+    ledger.fill('USDT_BTC', 'sell', 1.0, 110.0)
+    ledger.mark('USDT_BTC', 50.0)
+    # flat: later prices no longer move the PnL
+    assert ledger.total_pnl == 10.0
+    assert ledger.max_drawdown == 40.0
+
+
+def test_sell_without_position_does_not_short():
+    ledger = Ledger(fee_percent=0.2)
+    ledger.fill('USDT_BTC', 'sell', 0.5, 100.0)
+    position = ledger.position('USDT_BTC')
+    assert position.quantity == 0
+    assert position.realized_pnl == 0
+    assert position.fees == pytest.approx(0.1)
+
+
+def test_empty_buy_while_flat():
+    ledger = Ledger(fee_percent=0.2)
+    ledger.fill('USDT_BTC', 'buy', 0.0, 100.0)
+    assert ledger.position('USDT_BTC').quantity == 0
+    assert len(ledger) == 1
+
+
+def test_replay_ends_flat_after_selling_the_stack():
+    candles = load_candles(os.path.join(DATASETS, 'test1.csv'))['USDT_BTC']
+    replay = Replay(MarketData(), 'USDT_BTC', 1000, 0, 0.2)
+    for i, close in enumerate(candles['close']):
+        replay.add(candles, i)
+        if i >= 336:
+            replay.evaluate(close)
+    position = replay.engine.ledger.position('USDT_BTC')
+    assert len(replay.engine.ledger) >= 2
+    assert replay.coins == pytest.approx(position.quantity, abs=1e-12)
@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from utils.dataset import COLUMNS, load_candles
+from utils.market import MarketData
+
+DATASETS = os.path.join(os.path.dirname(__file__), '..', 'datasets')
+
+
+def feed(market, count):
+    candles = load_candles(os.path.join(DATASETS, 'test1.csv'))['USDT_BTC']
+    for i in range(count):
+        market.add_data('USDT_BTC', *(candles[column][i] for column in COLUMNS))
+    return market
+
+
+def test_bounded_history_refuses_full_history_indicators():
+    market = feed(MarketData(), 300)
+    with pytest.raises(RuntimeError):
+        market.ADX_indicator('USDT_BTC', 100)
+    with pytest.raises(RuntimeError):
+        market.bollinger_bands('USDT_BTC')
+    with pytest.raises(RuntimeError):
+        market.smoothed_moving_average(market.data['USDT_BTC']['close'], 50)
+
+
+def test_ring_buffers_serve_indicators_until_they_drop_candles():
+    bounded, full = feed(MarketData(retention=300), 300), feed(MarketData(retention=None), 300)
+    assert bounded.ADX_indicator('USDT_BTC', 100) == pytest.approx(full.ADX_indicator('USDT_BTC', 100))
+    assert bounded.bollinger_bands('USDT_BTC') == pytest.approx(full.bollinger_bands('USDT_BTC'))
+    assert bounded.exponential_moving_average('USDT_BTC', 50) == pytest.approx(
+        full.exponential_moving_average('USDT_BTC', 50))
+    feed(bounded, 1)
+    with pytest.raises(RuntimeError):
+        bounded.ADX_indicator('USDT_BTC', 100)
+
+
+def test_bounded_signals_match_full_history():
+    bounded, full = feed(MarketData(), 300), feed(MarketData(retention=None), 300)
+    em50, prediction, di_plus, di_minus, upper, lower, ema = bounded.indicators_signal('USDT_BTC')
+    full_em50, full_prediction, full_di_plus, full_di_minus, full_upper, full_lower, full_ema = \
+        full.indicators_signal('USDT_BTC')
+    assert em50 == pytest.approx(full_em50[-2:])
+    assert ema == pytest.approx(full_ema[-2:])
+    assert (prediction, di_plus, di_minus, upper, lower) == \
+        pytest.approx((full_prediction, full_di_plus, full_di_minus, full_upper, full_lower))
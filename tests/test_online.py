@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from utils.dataset import COLUMNS, load_candles
+from utils.market import MarketData
+from utils.online import KalmanTrend, RecursiveLeastSquares
+
+DATASETS = os.path.join(os.path.dirname(__file__), '..', 'datasets')
+
+
+@pytest.mark.parametrize('predictor', [RecursiveLeastSquares, KalmanTrend])
+def test_noiseless_line_is_extrapolated(predictor):
+    model = predictor()
+    assert model.predict() is None
+    for x in range(60):
+        model.update(100 + 2.5 * x)
+        if x == 0:
+            assert model.uncertainty() is None
+        else:
+            assert model.uncertainty() >= 0
+    assert model.predict(1) == pytest.approx(100 + 2.5 * 60)
+    assert model.predict(5) == pytest.approx(100 + 2.5 * 64)
+
+
+@pytest.mark.parametrize('predictor', ['rls', 'kalman'])
+def test_bounded_and_full_history_predict_the_same(predictor):
+    candles = load_candles(os.path.join(DATASETS, 'test1.csv'))['USDT_BTC']
+    bounded, full = MarketData(), MarketData(retention=None)
+    for market in (bounded, full):
+        market.predictor = predictor
+    for i in range(400):
+        for market in (bounded, full):
+            market.add_data('USDT_BTC', *(candles[column][i] for column in COLUMNS))
+        if i >= 336:
+            assert bounded.indicators_signal('USDT_BTC')[1] == pytest.approx(full.indicators_signal('USDT_BTC')[1],
+                                                                              rel=1e-12)
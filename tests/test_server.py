@@ -0,0 +1,50 @@
+import asyncio
+import io
+
+from utils.server import BotServer, Session
+from utils.trade import Trader
+
+
+def play_in_process(lines):
+    output = io.StringIO()
+    trader = Trader(output=output)
+    for line in lines:
+        trader.parse(line)
+    return output.getvalue()
+
+
+def test_session_matches_trader(game):
+    lines = game({'USDT_BTC': 'test1.csv'})
+    session = Session()
+    assert ''.join(session.feed(line) for line in lines) == play_in_process(lines)
+    assert session.commands == len(lines)
+
+
+def test_server_hosts_concurrent_games(game, tmp_path, caplog):
+    games = [game({'USDT_BTC': dataset}, turns=20) for dataset in ('test1.csv', 'test2.csv', 'test3.csv')] * 4
+    broken = ['update', 'action order']
+    path = str(tmp_path / 'bot.sock')
+    bot = BotServer(path=path)
+
+    async def play(lines):
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(''.join(line + '\n' for line in lines).encode())
+        await writer.drain()
+        writer.write_eof()
+        output = await reader.read()
+        writer.close()
+        await writer.wait_closed()
+        return output.decode()
+
+    async def main():
+        server = await asyncio.start_unix_server(bot.handle, path)
+        async with server:
+            return await asyncio.gather(play(broken), *(play(lines) for lines in games))
+
+    outputs = asyncio.run(main())
+    assert outputs[0] == ''
+    assert outputs[1:] == [play_in_process(lines) for lines in games]
+    assert bot.served == len(games) + 1
+    assert bot.sessions == {}
+    # the malformed game is dropped by handle, not reported by asyncio as unhandled
+    assert not [record for record in caplog.records if record.name == 'asyncio']
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from utils import streaming
+from utils.backtest import Backtester
+from utils.dataset import load_candles
+from utils.features import FeatureStore
+from utils.streaming import StreamingIndicators
+from utils.sweep import BatchEvaluator, grid
+
+DATASETS = os.path.join(os.path.dirname(__file__), '..', 'datasets')
+PARAMETERS = grid(smma_period=(20, 50), adx_period=(50, 100), bollinger_deviation=(1.5, 2),
+                  take_profit=(0.02, 0.5), stop_loss=(0.02, 0.2))
+
+
+def backtest(candles, row, coins):
+    smma_period, adx_period, bollinger_period, deviation, take_profit, stop_loss = row
+    indicators = StreamingIndicators(1, smma_period, 50, adx_period, bollinger_period, deviation)
+    backtester = Backtester(1, coins=coins, take_profit=take_profit, stop_loss=stop_loss, indicators=indicators)
+    backtester.run(([h], [l], [c]) for h, l, c in zip(candles['high'], candles['low'], candles['close']))
+    return backtester.returns([candles['close'][-1]])[0], backtester.max_drawdown[0]
+
+
+@pytest.mark.parametrize('dataset', ['test1.csv', 'test2.csv'])
+@pytest.mark.parametrize('coins', [0, 0.01])
+def test_evaluate_matches_backtester(dataset, coins):
+    candles = load_candles(os.path.join(DATASETS, dataset))['USDT_BTC']
+    results = BatchEvaluator(candles, coins=coins).evaluate(PARAMETERS)
+    expected = [backtest(candles, row, coins) for row in PARAMETERS]
+    assert results == pytest.approx(expected, rel=1e-12, abs=1e-12)
+    # the take profit and stop loss values must fire for the exits to be tested
+    default = {row[:4]: result for row, result in zip(PARAMETERS, results) if row[4:] == (0.5, 0.2)}
+    assert any(result != default[row[:4]] for row, result in zip(PARAMETERS, results))
+
+
+def test_indicator_version_is_part_of_the_feature_key(tmp_path, monkeypatch):
+    candles = load_candles(os.path.join(DATASETS, 'test1.csv'))['USDT_BTC']
+    store = FeatureStore(str(tmp_path))
+    results = BatchEvaluator(candles, store=store).evaluate(PARAMETERS)
+    cached = BatchEvaluator(candles, store=store)
+    assert cached.evaluate(PARAMETERS) == results
+    # series read from the store are memoryviews of the mapped files
+    assert all(isinstance(series, memoryview) for series in cached.series.values())
+    monkeypatch.setattr(streaming, 'VERSION', streaming.VERSION + 1)
+    recomputed = BatchEvaluator(candles, store=store)
+    assert recomputed.evaluate(PARAMETERS) == results
+    assert not any(isinstance(series, memoryview) for series in recomputed.series.values())
@@ -0,0 +1,275 @@
+import argparse
+from math import sqrt
+
+from .dataset import load_candles
+from .online import PREDICTORS
+from .streaming import StreamingIndicators
+
+FLAT = 0
+HOLDING = 1
+DONE = 2
+
+
+class Backtester:
+    """Simulate the MarketData trading rules on many price series at once.
+
+    Each lane is an independent game with its own stack of dollars and coins.
+    Lanes follow the decision flow of MarketData.buy_or_sell_signal: money
+    management first, no new position once a trade has been made, then the buy
+    rule, the zero sell stack buy and the sell rule. A lane that leaves the flat
+    state never needs the indicators again, so it is dropped from the
+    StreamingIndicators state and only its take profit / stop loss is checked.
+
+    Parameters
+    ----------
+    lanes : int
+        Number of games simulated together
+    dollars : float, optional
+        Initial stack of the quote currency (default is 1000)
+    coins : float, optional
+        Initial stack of the traded currency (default is 0)
+    fee_percent : float, optional
+        Transaction fee per order in percent (default is 0.2)
+    take_profit : float or list, optional
+        Position return that triggers a take profit sell, per lane if a list (default is 0.5)
+    stop_loss : float or list, optional
+        Position loss ratio that triggers a stop loss sell, per lane if a list (default is 0.2)
+    warmup : int, optional
+        Number of candles given before the first order is requested (default is 337)
+    indicators : StreamingIndicators, optional
+        Indicator state for every lane, created with default periods if omitted
+
+    Attributes
+    ----------
+    dollars, coins : list
+        Current stacks of each lane
+    state : list
+        FLAT, HOLDING or DONE for each lane
+    max_drawdown : list
+        Largest relative drop of each lane's equity from its peak
+
+    Examples
+    --------
+    >>> backtest = Backtester(lanes=len(paths))
+    >>> backtest.run(zip(highs, lows, closes))
+    >>> backtest.returns(closes[-1])
+    """
+    def __init__(self, lanes, dollars=1000, coins=0, fee_percent=0.2, take_profit=0.5, stop_loss=0.2,
+                 warmup=337, indicators=None):
+        self.lanes = lanes
+        self.fee = fee_percent / 100
+        self.warmup = warmup
+        self.indicators = indicators if indicators is not None else StreamingIndicators(lanes)
+        self.candles = 0
+        self.initial_equity = None
+
+        take_profit = take_profit if isinstance(take_profit, list) else [take_profit] * lanes
+        stop_loss = stop_loss if isinstance(stop_loss, list) else [stop_loss] * lanes
+        self.take_profit = take_profit
+        self.stop_loss = stop_loss
+        self.dollars = [float(dollars)] * lanes
+        self.coins = [float(coins)] * lanes
+        self.state = [FLAT] * lanes
+        self.peak = [0.0] * lanes
+        self.max_drawdown = [0.0] * lanes
+        self._exit_high = [0.0] * lanes
+        self._exit_low = [0.0] * lanes
+        self._flat = list(range(lanes))
+        self._holding = []
+        self._exited = []
+
+    def run(self, candles):
+        """
+        Feed a sequence of candles through every lane.
+
+        Parameters
+        ----------
+        candles : iterable
+            (highs, lows, closes) tuples, one value per lane in each list
+
+        Returns
+        -------
+        None
+        """
+        for highs, lows, closes in candles:
+            self.step(highs, lows, closes)
+
+    def step(self, highs, lows, closes):
+        """
+        Process one candle: update the indicators, take decisions and track equity.
+
+        Parameters
+        ----------
+        highs, lows, closes : list
+            High, low and close price of the new candle, one value per lane
+
+        Returns
+        -------
+        None
+        """
+        flat = self._flat
+        if flat:
+            if len(flat) == self.lanes:
+                self.indicators.update(highs, lows, closes)
+            else:
+                self.indicators.update([highs[i] for i in flat], [lows[i] for i in flat],
+                                       [closes[i] for i in flat])
+        self.candles += 1
+        if self.initial_equity is None:
+            self.initial_equity = [d + c * p for d, c, p in zip(self.dollars, self.coins, closes)]
+            self.peak = list(self.initial_equity)
+
+        self._exited = []
+        if self.candles >= self.warmup:
+            self._money_management(closes)
+            if flat and self.indicators.ready:
+                self._signals(closes)
+
+        dollars, coins, peak, max_drawdown = self.dollars, self.coins, self.peak, self.max_drawdown
+        for lanes in (self._flat, self._holding, self._exited):
+            for i in lanes:
+                equity = dollars[i] + coins[i] * closes[i]
+                if equity > peak[i]:
+                    peak[i] = equity
+                elif peak[i] > 0 and 1 - equity / peak[i] > max_drawdown[i]:
+                    max_drawdown[i] = 1 - equity / peak[i]
+
+    def _buy(self, i, price):
+        amount = self.dollars[i] / price
+        self.coins[i] += amount * (1 - self.fee)
+        self.dollars[i] -= amount * price
+        self.state[i] = HOLDING
+        self._exit_high[i] = price * (1 + self.take_profit[i])
+        self._exit_low[i] = price * (1 - self.stop_loss[i])
+
+    def _sell(self, i, price):
+        self.dollars[i] += self.coins[i] * price * (1 - self.fee)
+        self.coins[i] = 0.0
+        self.state[i] = DONE
+        self._exited.append(i)
+
+    def _money_management(self, closes):
+        exit_high, exit_low = self._exit_high, self._exit_low
+        exits = [i for i in self._holding if closes[i] >= exit_high[i] or closes[i] <= exit_low[i]]
+        if not exits:
+            return
+        for i in exits:
+            self._sell(i, closes[i])
+        self._holding = [i for i in self._holding if self.state[i] == HOLDING]
+
+    def _signals(self, closes):
+        flat = self._flat
+        flat_closes = [closes[i] for i in flat]
+        buys, sells = self.indicators.signals(flat_closes)
+        kept = []
+        for j, i in enumerate(flat):
+            if buys[j] or self.coins[i] == 0:
+                self._buy(i, flat_closes[j])
+                self._holding.append(i)
+            elif sells[j]:
+                self._sell(i, flat_closes[j])
+            else:
+                kept.append(j)
+        if len(kept) < len(flat):
+            self.indicators.keep(kept)
+            self._flat = [flat[j] for j in kept]
+
+    def equity(self, closes):
+        """
+        Value of each lane's stacks at the given prices.
+
+        Parameters
+        ----------
+        closes : list
+            Close price of each lane
+
+        Returns
+        -------
+        list
+            dollars + coins * close for each lane
+        """
+        return [d + c * p for d, c, p in zip(self.dollars, self.coins, closes)]
+
+    def returns(self, closes):
+        """
+        Total return of each lane since the first candle.
+
+        Parameters
+        ----------
+        closes : list
+            Close price of each lane
+
+        Returns
+        -------
+        list
+            equity / initial equity - 1 for each lane
+        """
+        return [e / i - 1 for e, i in zip(self.equity(closes), self.initial_equity)]
+
+
+def compare_predictors(candles, predictors=('regression', 'rls', 'kalman'), **options):
+    """
+    Backtest the strategy on one dataset with each price predictor.
+
+    Besides the result of the game, each predictor is scored on its forecast of
+    the close two candles ahead, the horizon used by indicators_signal.
+
+    Parameters
+    ----------
+    candles : dict
+        Columns of one pair, as returned by load_candles
+    predictors : iterable, optional
+        Names of the predictors to compare (default is every predictor)
+    **options
+        Keyword arguments passed to the Backtester
+
+    Returns
+    -------
+    dict
+        For each predictor: 'return' and 'drawdown' of the game, 'mae' and
+        'rmse' of the forecasts, and for online predictors 'coverage', the
+        share of closes within two standard deviations of the forecast
+    """
+    highs, lows, closes = candles['high'], candles['low'], candles['close']
+    report = {}
+    for name in predictors:
+        backtest = Backtester(1, indicators=StreamingIndicators(1, predictor=name), **options)
+        stream = StreamingIndicators(1, predictor=name)
+        model = PREDICTORS[name]() if name in PREDICTORS else None
+        forecasts = []
+        for high, low, close in zip(highs, lows, closes):
+            backtest.step([high], [low], [close])
+            stream.update([high], [low], [close])
+            if model is not None:
+                model.update(close)
+            forecasts.append((stream.prediction[0], model.uncertainty(2) if model is not None else None))
+
+        errors = [close - forecast for close, (forecast, _) in zip(closes[3:], forecasts[1:])]
+        result = {
+            'return': backtest.returns([closes[-1]])[0],
+            'drawdown': backtest.max_drawdown[0],
+            'mae': sum(abs(error) for error in errors) / len(errors),
+            'rmse': sqrt(sum(error * error for error in errors) / len(errors)),
+        }
+        if model is not None:
+            spreads = [spread for _, spread in forecasts[1:]]
+            result['coverage'] = sum(abs(error) <= 2 * spread for error, spread in zip(errors, spreads)) / len(errors)
+        report[name] = result
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the price predictors on datasets")
+    parser.add_argument('datasets', nargs='+', help="CSV datasets to backtest on")
+    parser.add_argument('--predictors', nargs='+', default=['regression'] + list(PREDICTORS))
+    parser.add_argument('--coins', type=float, default=0)
+    args = parser.parse_args()
+
+    for path in args.datasets:
+        for pair, candles in load_candles(path).items():
+            for name, result in compare_predictors(candles, args.predictors, coins=args.coins).items():
+                print(f'{path} {pair} {name:<10} ' + ' '.join(f'{key}={value:.4f}' for key, value in result.items()))
+
+
+if __name__ == '__main__':
+    main()
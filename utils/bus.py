@@ -0,0 +1,373 @@
+import io
+import multiprocessing
+import queue
+import traceback
+import zlib
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+from .debug import Debugger
+from .market import MarketData
+
+FIELDS = ('date', 'high', 'low', 'open', 'close', 'volume')
+
+
+class CandleRing:
+    """A ring buffer of candles in shared memory, written by one process and read by others.
+
+    The segment starts with an int64 sequence number, the count of candles
+    written so far, followed by capacity slots of six float64 values. The
+    writer fills a slot before publishing it by incrementing the sequence, so
+    readers only ever read complete candles. Readers access the segment through
+    memoryviews, without copying or pickling it.
+
+    Parameters
+    ----------
+    name : str, optional
+        Name of an existing segment to attach to; a new segment is created if None
+    capacity : int, optional
+        Number of candles retained (default is 4096)
+
+    Examples
+    --------
+    >>> ring = CandleRing(capacity=8)
+    >>> ring.write((1622548800.0, 36597.26, 36112.01, 36596.63, 36164.95, 122194005.0))
+    >>> reader = CandleRing(ring.name, capacity=8)
+    >>> list(reader.read(0, reader.sequence))
+    """
+    def __init__(self, name=None, capacity=4096):
+        self.capacity = capacity
+        size = 8 + capacity * len(FIELDS) * 8
+        self.shm = SharedMemory(name=name, create=name is None, size=size)
+        self.name = self.shm.name
+        self._sequence = self.shm.buf[:8].cast('q')
+        self._values = self.shm.buf[8:size].cast('d')
+
+    @property
+    def sequence(self):
+        """
+        Number of candles written since the ring was created.
+
+        Returns:
+            int: The sequence number of the next candle
+        """
+        return self._sequence[0]
+
+    def write(self, candle):
+        """
+        Append a candle and publish it to the readers.
+
+        Args:
+            candle (tuple): date, high, low, open, close and volume
+
+        Returns:
+            None
+        """
+        sequence = self._sequence[0]
+        offset = (sequence % self.capacity) * len(FIELDS)
+        for i, value in enumerate(candle):
+            self._values[offset + i] = value
+        self._sequence[0] = sequence + 1
+
+    def last(self):
+        """
+        Return the most recent candle.
+
+        Returns:
+            tuple or None: date, high, low, open, close and volume, None if the ring is empty
+        """
+        sequence = self._sequence[0]
+        if sequence == 0:
+            return None
+        return next(self.read(sequence - 1, sequence))
+
+    def read(self, start, stop):
+        """
+        Iterate over the candles with sequence numbers in [start, stop).
+
+        Args:
+            start (int): Sequence number of the first candle
+            stop (int): Sequence number after the last candle, at most sequence
+
+        Yields:
+            tuple: date, high, low, open, close and volume of each candle
+
+        Raises:
+            OverflowError: If some of the candles have already been overwritten
+        """
+        if self._sequence[0] - start > self.capacity:
+            raise OverflowError(f"Candles {start} to {self._sequence[0] - self.capacity} were overwritten")
+        width = len(FIELDS)
+        for sequence in range(start, stop):
+            offset = (sequence % self.capacity) * width
+            yield tuple(self._values[offset:offset + width])
+
+    def close(self, unlink=False):
+        """
+        Detach from the segment, and destroy it if unlink is True.
+
+        Args:
+            unlink (bool, optional): Whether to free the shared memory (default is False)
+
+        Returns:
+            None
+        """
+        self._sequence.release()
+        self._values.release()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def strategy_worker(tasks, results, strategy, predictor):
+    """
+    Run the strategy of the pairs assigned to this worker process.
+
+    Each pair gets its own strategy instance. Before deciding, the worker reads
+    the candles published since its last read from the ring of the pair. If
+    some were overwritten before being read, it logs them and resumes from the
+    oldest candle left in the ring. An exception raised by the strategy is
+    sent back as the result of the decision, and the worker keeps serving.
+
+    Messages received on tasks:
+        ('attach', pair, ring name, capacity): start following a pair
+        ('read', pair, sequence): read the candles before sequence
+        ('decide', index, pair, sequence, dollars, coins, asset, fee_percent, shared):
+            read the candles before sequence and decide on a pair, then put
+            (index, orders, shared, error) on results; shared is None or the
+            (list_buys, list_sells) the strategy starts from and ends with
+        ('stop',): exit
+
+    Parameters
+    ----------
+    tasks : multiprocessing.Queue
+        Messages from the main process
+    results : multiprocessing.Queue
+        Decisions sent back to the main process
+    strategy : type
+        MarketData-compatible class taking the decisions
+    predictor : str
+        Price predictor of the strategy
+
+    Returns
+    -------
+    None
+    """
+    rings, markets, read, failed = {}, {}, {}, {}
+    debug = Debugger()
+
+    def catch_up(pair, sequence):
+        ring = rings[pair]
+        while True:
+            try:
+                for candle in ring.read(read[pair], sequence):
+                    markets[pair].add_data(pair, *candle)
+                    read[pair] += 1
+                return
+            except OverflowError:
+                # resync on the oldest candle still in the ring
+                oldest = ring.sequence - ring.capacity
+                debug.print(f"{pair}: skipped {oldest - read[pair]} candles overwritten before they were read")
+                read[pair] = oldest
+
+    def failure(pair):
+        return RuntimeError(f"Strategy of {pair} failed in its worker process:\n{traceback.format_exc()}")
+
+    while True:
+        message = tasks.get()
+        if message[0] == 'stop':
+            break
+        if message[0] == 'attach':
+            _, pair, name, capacity = message
+            rings[pair] = CandleRing(name, capacity)
+            market = markets[pair] = strategy()
+            market.predictor = predictor
+            market.output = io.StringIO()
+            read[pair] = 0
+            continue
+        if message[0] == 'read':
+            _, pair, sequence = message
+            try:
+                catch_up(pair, sequence)
+            except Exception:
+                # reported by the next decision on the pair
+                failed[pair] = failure(pair)
+            continue
+        _, index, pair, sequence, dollars, coins, asset, fee_percent, shared = message
+        market = markets[pair]
+        orders, error = None, failed.pop(pair, None)
+        if error is None:
+            try:
+                catch_up(pair, sequence)
+                market.ledger.fee_percent = fee_percent
+                if shared is not None:
+                    market.list_buys, market.list_sells = shared
+                market.buy_or_sell_signal(pair, dollars, coins, asset)
+                orders = market.output.getvalue()
+                if shared is not None:
+                    shared = (market.list_buys, market.list_sells)
+            except Exception:
+                error = failure(pair)
+        results.put((index, orders, shared, error))
+        market.output.seek(0)
+        market.output.truncate()
+    for ring in rings.values():
+        ring.close()
+
+
+class CandleBus:
+    """Split candle ingestion and strategy evaluation across processes.
+
+    The main process publishes candles into one shared memory CandleRing per
+    pair. Each pair is assigned to one of the strategy worker processes, which
+    reads the ring and keeps the indicator state of the pair, so candles of
+    different pairs are ingested in parallel. Only small decide/result
+    messages go through queues.
+
+    A single MarketData shares its list_buys/list_sells between all pairs, and
+    each decision sees the orders of the pairs decided before it. To take the
+    same decisions, the bus passes these lists from one decision to the next,
+    so decisions are made in order once every worker has read its candles.
+    With isolated=True each pair keeps its own lists instead and decisions run
+    in parallel, which changes the decisions of games with several pairs.
+
+    An exception in a strategy is raised again by decide, and a worker that
+    dies makes decide raise instead of waiting for it.
+
+    Parameters
+    ----------
+    workers : int, optional
+        Number of strategy worker processes (default is 2)
+    capacity : int, optional
+        Candles retained per ring; candles published between two decisions
+        beyond it are skipped by the strategy, with a log (default is 4096)
+    strategy : type, optional
+        MarketData-compatible class taking the decisions (default is MarketData)
+    predictor : str, optional
+        Price predictor of the strategy (default is 'regression')
+    isolated : bool, optional
+        Whether each pair has its own list_buys/list_sells (default is False)
+
+    Attributes
+    ----------
+    fee_percent : float
+        Transaction fee given to the ledger of the strategies, in percent
+
+    Examples
+    --------
+    >>> bus = CandleBus(workers=2)
+    >>> bus.publish('USDT_BTC', (1622548800.0, 36597.26, 36112.01, 36596.63, 36164.95, 122194005.0))
+    >>> bus.decide([('USDT_BTC', 1000.0, 0.0, 1000.0)])
+    >>> bus.close()
+    """
+    def __init__(self, workers=2, capacity=4096, strategy=MarketData, predictor='regression', isolated=False):
+        self.capacity = capacity
+        self.isolated = isolated
+        self.fee_percent = 0.0
+        self.shared = ([], [])
+        self.rings = {}
+        self.results = multiprocessing.Queue()
+        self.tasks = []
+        self.processes = []
+        # start the resource tracker before forking so the workers share it,
+        # otherwise each worker tracks the rings it attaches as its own leaks
+        resource_tracker.ensure_running()
+        for _ in range(workers):
+            tasks = multiprocessing.Queue()
+            process = multiprocessing.Process(target=strategy_worker,
+                                              args=(tasks, self.results, strategy, predictor), daemon=True)
+            process.start()
+            self.tasks.append(tasks)
+            self.processes.append(process)
+
+    def worker(self, pair):
+        """
+        Return the task queue of the worker assigned to a pair.
+
+        Args:
+            pair (str): The trading pair symbol
+
+        Returns:
+            multiprocessing.Queue: The queue of the worker following the pair
+        """
+        return self.tasks[zlib.crc32(pair.encode()) % len(self.tasks)]
+
+    def publish(self, pair, candle):
+        """
+        Write a candle to the ring of its pair, creating the ring on first use.
+
+        Args:
+            pair (str): The trading pair symbol
+            candle (tuple): date, high, low, open, close and volume
+
+        Returns:
+            None
+        """
+        ring = self.rings.get(pair)
+        if ring is None:
+            ring = self.rings[pair] = CandleRing(capacity=self.capacity)
+            self.worker(pair).put(('attach', pair, ring.name, self.capacity))
+        ring.write(candle)
+
+    def decide(self, requests):
+        """
+        Ask the workers for a decision on several pairs.
+
+        Args:
+            requests (list): (pair, dollars, coins, asset) tuples
+
+        Returns:
+            list: The orders written by the strategy for each request, in order
+
+        Raises:
+            RuntimeError: If a strategy failed, with its traceback, or a worker died
+        """
+        orders = [None] * len(requests)
+        errors = [None] * len(requests)
+        if self.isolated:
+            for index, request in enumerate(requests):
+                self._send(index, request, None)
+            for _ in requests:
+                index, orders[index], _, errors[index] = self._result()
+        else:
+            for pair, *_ in requests:
+                self.worker(pair).put(('read', pair, self.rings[pair].sequence))
+            for index, request in enumerate(requests):
+                self._send(index, request, self.shared)
+                _, orders[index], self.shared, error = self._result()
+                if error is not None:
+                    raise error
+        for error in errors:
+            if error is not None:
+                raise error
+        return orders
+
+    def _send(self, index, request, shared):
+        pair, dollars, coins, asset = request
+        self.worker(pair).put(('decide', index, pair, self.rings[pair].sequence, dollars, coins, asset,
+                               self.fee_percent, shared))
+
+    def _result(self, poll=1.0):
+        """Wait for the next decision, raising RuntimeError if a worker died meanwhile."""
+        while True:
+            try:
+                return self.results.get(timeout=poll)
+            except queue.Empty:
+                for process in self.processes:
+                    if not process.is_alive():
+                        raise RuntimeError(f"Strategy worker {process.pid} exited with code {process.exitcode}")
+
+    def close(self):
+        """
+        Stop the workers and free the shared memory.
+
+        Returns:
+            None
+        """
+        for tasks in self.tasks:
+            tasks.put(('stop',))
+        for process in self.processes:
+            process.join()
+        for ring in self.rings.values():
+            ring.close(unlink=True)
+        self.rings = {}
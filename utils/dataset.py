@@ -0,0 +1,33 @@
+import csv
+
+COLUMNS = ('date', 'high', 'low', 'open', 'close', 'volume')
+
+
+def load_candles(path):
+    """
+    Load a candle dataset from a CSV file.
+
+    The file must have a header containing at least the pair and the columns of
+    COLUMNS (the format of the files in datasets/). Candles are grouped by pair
+    and sorted by date, since some training sets are stored newest first.
+
+    Args:
+        path (str): Path to the CSV file
+
+    Returns:
+        dict: Mapping of pair to a dict of column name to list of floats
+
+    Example:
+        >>> candles = load_candles('datasets/test1.csv')
+        >>> candles['USDT_BTC']['close'][:2]
+        [18418.15, 18372.37]
+    """
+    rows = {}
+    with open(path, newline='') as file:
+        for row in csv.DictReader(file):
+            rows.setdefault(row['pair'], []).append(tuple(float(row[column]) for column in COLUMNS))
+    candles = {}
+    for pair, values in rows.items():
+        values.sort(key=lambda candle: candle[0])
+        candles[pair] = {column: [candle[i] for candle in values] for i, column in enumerate(COLUMNS)}
+    return candles
@@ -0,0 +1,257 @@
+import argparse
+import contextlib
+import glob
+import importlib
+import io
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from .dataset import load_candles
+from .market import MarketData
+from .streaming import StreamingIndicators
+
+INDICATORS = ('smma', 'smma_prev', 'prediction', 'di_plus', 'di_minus', 'upper', 'lower', 'ema', 'ema_prev')
+
+
+class ReferenceMarketData(MarketData):
+    """MarketData keeping the full history and recomputing every indicator from it.
+
+    The default reference engine of the harness: the original implementation
+    of the indicators, before bounded retention and incremental state.
+    """
+    def __init__(self):
+        super().__init__(retention=None)
+
+
+def indicator_values(signal):
+    """
+    Flatten the result of indicators_signal into the values used by the trading rules.
+
+    Args:
+        signal (tuple): The tuple returned by MarketData.indicators_signal, or None
+            if the engine failed
+
+    Returns:
+        dict: One value per name of INDICATORS, None for the values not available
+    """
+    if signal is None:
+        return dict.fromkeys(INDICATORS)
+    em50, prediction, di_plus, di_minus, upper, lower, ema = signal
+
+    def last_two(values):
+        values = list(values or [])[-2:]
+        return [None] * (2 - len(values)) + values
+
+    smma_prev, smma = last_two(em50)
+    ema_prev, ema = last_two(ema)
+    return dict(zip(INDICATORS, (smma, smma_prev, prediction, di_plus, di_minus, upper, lower, ema, ema_prev)))
+
+
+def differs(reference, alternative, tolerance):
+    """
+    Tell whether two indicator values disagree.
+
+    NaN or None on either side is a disagreement, even on both sides.
+
+    Args:
+        reference, alternative (float): Values of the two engines
+        tolerance (float): Relative tolerance
+
+    Returns:
+        bool: True if the values do not match
+    """
+    if reference is None or alternative is None:
+        return True
+    return not math.isclose(reference, alternative, rel_tol=tolerance)
+
+
+def load_engine(path):
+    """
+    Import an engine class from a 'module:Class' path.
+
+    Args:
+        path (str): e.g. 'utils.market:MarketData'
+
+    Returns:
+        type: The engine class, a MarketData-compatible class
+    """
+    module, _, name = path.partition(':')
+    return getattr(importlib.import_module(module), name)
+
+
+class Replay:
+    """Feed one pair of a dataset to an engine, candle by candle, as the game would.
+
+    The engine is any MarketData-compatible object. Stacks start from the
+    given amounts and are updated from the orders of the engine, with the fee
+    of the game applied.
+
+    Parameters
+    ----------
+    engine : MarketData
+        The engine under test
+    pair : str
+        The trading pair being replayed
+    dollars, coins : float
+        Initial stacks of the quote and traded currencies
+    fee_percent : float
+        Transaction fee per order in percent
+    """
+    def __init__(self, engine, pair, dollars, coins, fee_percent):
+        self.engine = engine
+        self.pair = pair
+        self.dollars = dollars
+        self.coins = coins
+        self.fee = fee_percent / 100
+        self.engine.output = io.StringIO()
+        self.engine.ledger.fee_percent = fee_percent
+
+    def add(self, candles, i):
+        self.engine.add_data(self.pair, *(candles[column][i] for column in
+                                          ('date', 'high', 'low', 'open', 'close', 'volume')))
+
+    def evaluate(self, close):
+        """
+        Compute the indicators and the decision for the last candle.
+
+        Args:
+            close (float): The last close, used to value the stacks and apply orders
+
+        Returns:
+            tuple: (indicator values dict, decision line, stacks before the decision); if the
+                engine raises, the decision is the exception and no order is applied
+        """
+        engine, pair = self.engine, self.pair
+        stacks = (self.dollars, self.coins)
+        values = None
+        try:
+            values = engine.indicators_signal(pair)
+            # let buy_or_sell_signal reuse the values just computed
+            engine.indicators_signal = lambda _: values
+            try:
+                engine.buy_or_sell_signal(pair, self.dollars, self.coins, self.dollars + self.coins * close)
+            finally:
+                del engine.indicators_signal
+            decision = engine.output.getvalue().strip()
+        except Exception as error:
+            decision = f'{type(error).__name__}: {error}'
+        engine.output.seek(0)
+        engine.output.truncate()
+
+        action, _, amount = decision.partition(f' {pair} ')
+        if action == 'buy':
+            self.dollars -= float(amount) * close
+            self.coins += float(amount) * (1 - self.fee)
+        elif action == 'sell':
+            self.dollars += float(amount) * close * (1 - self.fee)
+            self.coins -= float(amount)
+        return indicator_values(values), decision, stacks
+
+
+def compare(path, reference='utils.equivalence:ReferenceMarketData', alternative='utils.market:MarketData',
+            start=None, tolerance=1e-9, dollars=1000, coins=0.01, fee_percent=0.2):
+    """
+    Replay a dataset through two engines and find the first candle where they disagree.
+
+    Every candle from start on is evaluated by both engines. Indicator values
+    must be numbers agreeing within the relative tolerance, and decisions must
+    be identical.
+
+    Parameters
+    ----------
+    path : str
+        CSV dataset to replay
+    reference, alternative : str
+        'module:Class' paths of the engines
+    start : int, optional
+        Number of candles given before the first evaluation, by default the
+        warmup of the default StreamingIndicators
+    tolerance : float, optional
+        Relative tolerance on indicator values (default is 1e-9)
+    dollars, coins : float, optional
+        Initial stacks (default is 1000 and 0.01)
+    fee_percent : float, optional
+        Transaction fee per order in percent (default is 0.2)
+
+    Returns
+    -------
+    tuple
+        (path, candles compared, None) if the engines agree, otherwise
+        (path, candles compared, report) where report describes the first
+        divergent candle with the state of both engines
+    """
+    if start is None:
+        start = StreamingIndicators().warmup
+    compared = 0
+    with contextlib.redirect_stderr(io.StringIO()):
+        for pair, candles in load_candles(path).items():
+            replays = [Replay(load_engine(engine)(), pair, dollars, coins, fee_percent)
+                       for engine in (reference, alternative)]
+            for i in range(len(candles['close'])):
+                for replay in replays:
+                    replay.add(candles, i)
+                if i + 1 < start:
+                    continue
+                close = candles['close'][i]
+                (ref_values, ref_decision, ref_stacks), (alt_values, alt_decision, alt_stacks) = \
+                    (replay.evaluate(close) for replay in replays)
+                compared += 1
+                mismatches = [name for name in INDICATORS if differs(ref_values[name], alt_values[name], tolerance)]
+                if mismatches or ref_decision != alt_decision:
+                    report = [f'{path} {pair}: diverged at candle {i} (date {candles["date"][i]:.0f}, close {close})',
+                              f'  {"":<12}{"reference":>24}{"alternative":>24}']
+                    for name in INDICATORS:
+                        flag = '  <--' if name in mismatches else ''
+                        report.append(f'  {name:<12}{ref_values[name]!r:>24}{alt_values[name]!r:>24}{flag}')
+                    report.append(f'  {"stacks":<12}{"%.2f / %.8f" % ref_stacks:>24}{"%.2f / %.8f" % alt_stacks:>24}')
+                    report.append(f'  {"decision":<12}{ref_decision!r:>24}{alt_decision!r:>24}'
+                                  + ('  <--' if ref_decision != alt_decision else ''))
+                    return path, compared, '\n'.join(report)
+    return path, compared, None
+
+
+def _compare(arguments):
+    path, options = arguments
+    return compare(path, **options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that an alternative engine takes the same decisions "
+                                                 "as the reference on every dataset")
+    parser.add_argument('datasets', nargs='*', help="CSV datasets, every datasets/*.csv by default")
+    parser.add_argument('--reference', default='utils.equivalence:ReferenceMarketData')
+    parser.add_argument('--alternative', default='utils.market:MarketData')
+    parser.add_argument('--start', type=int, default=None)
+    parser.add_argument('--tolerance', type=float, default=1e-9)
+    parser.add_argument('--dollars', type=float, default=1000)
+    parser.add_argument('--coins', type=float, default=0.01)
+    parser.add_argument('--fee', type=float, default=0.2, help="transaction fee per order in percent")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    datasets = args.datasets or sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'datasets', '*.csv')))
+    options = {'reference': args.reference, 'alternative': args.alternative, 'start': args.start,
+               'tolerance': args.tolerance, 'dollars': args.dollars, 'coins': args.coins,
+               'fee_percent': args.fee}
+    tasks = [(path, options) for path in datasets]
+    workers = args.workers or os.cpu_count()
+    if workers == 1:
+        results = list(map(_compare, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_compare, tasks))
+
+    failed = False
+    for path, compared, report in results:
+        if report is None:
+            print(f'{os.path.relpath(path)}: {compared} candles identical')
+        else:
+            failed = True
+            print(report)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+from array import array
+
+FORMAT = 1
+MAGIC = b'FEATCOL1'
+HEADER = struct.Struct('<8sqq')
+SUFFIX = '.col'
+# age in seconds after which a temporary file is assumed left by a killed writer
+STALE = 3600
+
+
+def digest(candles):
+    """
+    Content hash of the candles the indicators are computed from.
+
+    Only the high, low and close columns are hashed, as no indicator reads the
+    others, so the same prices in another file share their features.
+
+    Args:
+        candles (dict): Columns of one pair, as returned by load_candles
+
+    Returns:
+        str: Hexadecimal SHA-256 of the columns
+    """
+    sha = hashlib.sha256()
+    for column in ('high', 'low', 'close'):
+        sha.update(array('d', candles[column]).tobytes())
+    return sha.hexdigest()
+
+
+class FeatureStore:
+    """A directory of computed indicator series, shared by research runs and workers.
+
+    Each entry holds the columns of one indicator computation, e.g. smma and
+    smma_prev for one SMMA period, in a columnar binary file: a header with
+    the column count and length, the column names as JSON padded to 8 bytes,
+    then each column as contiguous float64 values. Files are named after the
+    digest of the source candles and a hash of the indicator name and
+    parameters, so a changed dataset or parameter is simply a miss.
+
+    Reads memory-map the file and return memoryviews cast to 'd', without
+    copying or parsing the values. Writes go to a temporary file in the same
+    directory which is then renamed over the entry, so concurrent workers
+    computing the same feature never see a partial file and the last writer
+    wins with identical content. When the directory grows over max_bytes,
+    the least recently used entries are deleted; a hit refreshes the mtime of
+    its file for this purpose. Files that are short, foreign or of another
+    format are read as misses. Deleting a file another process has mapped is
+    safe, the mapping stays valid.
+
+    Parameters
+    ----------
+    path : str, optional
+        Directory of the store, created if missing (default is '.features')
+    max_bytes : int, optional
+        Size above which entries are evicted (default is 256 MiB)
+
+    Examples
+    --------
+    >>> store = FeatureStore()
+    >>> candles = load_candles('datasets/test1.csv')['USDT_BTC']
+    >>> store.save(digest(candles), 'smma', {'period': 50}, {'smma': [...], 'smma_prev': [...]})
+    >>> store.load(digest(candles), 'smma', {'period': 50})['smma'][-1]
+    """
+    def __init__(self, path='.features', max_bytes=256 << 20):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(path, exist_ok=True)
+
+    def filename(self, source, name, parameters):
+        """
+        Path of the entry of an indicator computed on some candles.
+
+        Args:
+            source (str): Digest of the candles, see digest()
+            name (str): Name of the indicator
+            parameters (dict): Parameters the series depend on
+
+        Returns:
+            str: Path of the entry file
+        """
+        key = json.dumps([FORMAT, name, parameters], sort_keys=True)
+        return os.path.join(self.path, f'{source[:32]}-{name}-{hashlib.sha256(key.encode()).hexdigest()[:16]}{SUFFIX}')
+
+    def load(self, source, name, parameters):
+        """
+        Read the columns of an entry.
+
+        Args:
+            source (str): Digest of the candles, see digest()
+            name (str): Name of the indicator
+            parameters (dict): Parameters the series depend on
+
+        Returns:
+            dict or None: Column name to memoryview of floats, None if the entry is missing
+        """
+        path = self.filename(source, name, parameters)
+        try:
+            with open(path, 'rb') as file:
+                view = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            # missing, evicted meanwhile, or empty
+            return None
+        try:
+            magic, width, length = HEADER.unpack_from(view)
+            names_size = struct.unpack_from('<q', view, HEADER.size)[0]
+            offset = HEADER.size + 8
+            names = json.loads(bytes(view[offset:offset + names_size]))
+        except (struct.error, ValueError):
+            # too short, or not written by this store
+            return None
+        offset += -(-names_size // 8) * 8
+        if magic != MAGIC or not isinstance(names, list) or len(names) != width \
+                or len(view) != offset + 8 * length * width:
+            return None
+        columns = {}
+        for column in names:
+            columns[column] = view[offset:offset + 8 * length].cast('d')
+            offset += 8 * length
+        return columns
+
+    def save(self, source, name, parameters, columns):
+        """
+        Write the columns of an entry atomically, then evict entries over the size cap.
+
+        Args:
+            source (str): Digest of the candles, see digest()
+            name (str): Name of the indicator
+            parameters (dict): Parameters the series depend on
+            columns (dict): Column name to sequence of floats, all of the same length
+
+        Returns:
+            None
+        """
+        names = json.dumps(list(columns)).encode()
+        length = len(next(iter(columns.values()))) if columns else 0
+        fd, temporary = tempfile.mkstemp(suffix='.tmp', dir=self.path)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(HEADER.pack(MAGIC, len(columns), length))
+                file.write(struct.pack('<q', len(names)))
+                file.write(names.ljust(-(-len(names) // 8) * 8, b' '))
+                for values in columns.values():
+                    if len(values) != length:
+                        raise ValueError(f"Feature columns of {name} have different lengths")
+                    file.write(array('d', values).tobytes())
+            os.replace(temporary, self.filename(source, name, parameters))
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        self.evict()
+
+    def evict(self):
+        """
+        Delete the least recently used entries until the store fits in max_bytes.
+
+        Temporary files of writes in progress count towards the size; those
+        older than STALE seconds were left by killed writers and are deleted.
+
+        Returns:
+            int: Number of files deleted
+        """
+        entries = []
+        total = 0
+        deleted = 0
+        now = time.time()
+        for entry in os.scandir(self.path):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if entry.name.endswith('.tmp'):
+                if now - stat.st_mtime > STALE and self._unlink(entry.path):
+                    deleted += 1
+                else:
+                    total += stat.st_size
+            elif entry.name.endswith(SUFFIX):
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if self._unlink(path):
+                deleted += 1
+            total -= size
+        return deleted
+
+    @staticmethod
+    def _unlink(path):
+        """Delete a file, False if another process already did."""
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            return False
+        return True
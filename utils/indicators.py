@@ -102,7 +102,8 @@ class Indicators:
             window (int): Number of periods to consider for the EMA calculation
 
         Returns:
-            None: Results are stored in self.data[pair]["ema"]
+            list or None: The EMA values, also stored in self.data[pair]["ema"].
+                None if there are fewer than 'window' closing prices.
 
         Notes:
             - Requires at least 'window' number of closing prices to begin calculation
@@ -112,12 +113,15 @@ class Indicators:
         """
         closes = self.data[pair]["close"]
         if len(closes) < window:
-            return
+            return None
         k = 2 / (window + 1)
         ema = statistics.mean(closes[:window])
+        values = []
         for i in range(window, len(closes)):
             ema = closes[i] * k + ema * (1 - k)
-            self.data[pair]["ema"].append(ema)
+            values.append(ema)
+        self.data[pair]["ema"] = values
+        return values
 
     def ADX_indicator(self, pair, period=14):
         """
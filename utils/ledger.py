@@ -0,0 +1,238 @@
+from array import array
+
+BUY = 1
+SELL = -1
+# remaining quantity, relative to the quantity sold, below which a sell closes the position
+DUST = 1e-6
+
+
+class Position:
+    """Running position state for a single trading pair.
+
+    Every field is updated in place by the owning Ledger so that reading the
+    current exposure or profit of a pair never requires rescanning past fills.
+
+    Attributes:
+        quantity (float): Coins held since the first fill, net of fees (never negative)
+        average_price (float): Average entry price of the open quantity
+        realized_pnl (float): Profit already locked in by closing fills, fees excluded
+        unrealized_pnl (float): Profit of the open quantity at the last marked price
+        fees (float): Total transaction fees paid on this pair
+        last_price (float): Last price the position was marked at
+    """
+    __slots__ = ('quantity', 'average_price', 'realized_pnl', 'unrealized_pnl', 'fees', 'last_price')
+
+    def __init__(self):
+        self.quantity = 0.0
+        self.average_price = 0.0
+        self.realized_pnl = 0.0
+        self.unrealized_pnl = 0.0
+        self.fees = 0.0
+        self.last_price = 0.0
+
+    @property
+    def cost_basis(self):
+        """
+        Value of the open quantity at its average entry price.
+
+        Returns:
+            float: abs(quantity) * average_price, 0.0 when flat
+        """
+        return abs(self.quantity) * self.average_price
+
+    @property
+    def return_ratio(self):
+        """
+        Price return of the open quantity since entry.
+
+        Returns:
+            float or None: unrealized_pnl / cost_basis, None when there is no open position
+
+        Example:
+            >>> position.return_ratio  # long from 100, marked at 150
+            0.5
+        """
+        cost = self.cost_basis
+        if cost == 0:
+            return None
+        return self.unrealized_pnl / cost
+
+
+class Ledger:
+    """A compact fill log with running per-pair position and profit tracking.
+
+    Fills are stored column-wise in typed arrays instead of a list of tuples, and
+    each fill or price mark updates the position, realized/unrealized PnL, fees,
+    high-water mark and drawdown in constant time.
+
+    Attributes:
+        fee_percent (float): Transaction fee charged on each fill, in percent of its notional
+        pairs (list): Trading pairs in order of first appearance, indexed by the fill log
+        positions (dict): Position state for each trading pair
+        realized_pnl (float): Realized profit over all pairs, fees excluded
+        unrealized_pnl (float): Unrealized profit over all pairs
+        fees (float): Transaction fees paid over all pairs
+        high_water_mark (float): Highest total PnL observed so far
+        max_drawdown (float): Largest drop of total PnL from its high-water mark
+
+    Methods:
+        fill: Record an executed order and update the position
+        mark: Revalue a position at a new price
+        position: Return the running state of a pair
+        fills: Iterate over the recorded fills
+
+    Example:
+        >>> ledger = Ledger(fee_percent=0.2)
+        >>> ledger.fill('USDT_BTC', 'buy', 1.0, 100.0)
+        >>> ledger.mark('USDT_BTC', 150.0)
+        >>> ledger.position('USDT_BTC').unrealized_pnl  # on the 0.998 coins delivered
+        49.9
+    """
+    def __init__(self, fee_percent=0):
+        self.fee_percent = fee_percent
+        self.pairs = []
+        self.positions = {}
+        self.realized_pnl = 0.0
+        self.unrealized_pnl = 0.0
+        self.fees = 0.0
+        self.high_water_mark = 0.0
+        self.max_drawdown = 0.0
+        self._pair_index = {}
+        self._pair = array('H')
+        self._side = array('b')
+        self._amount = array('d')
+        self._price = array('d')
+        self._fee = array('d')
+        self._date = array('d')
+
+    def __len__(self):
+        return len(self._side)
+
+    @property
+    def total_pnl(self):
+        """
+        Net profit over all pairs: realized plus unrealized, minus fees.
+
+        Returns:
+            float: The current total PnL
+        """
+        return self.realized_pnl + self.unrealized_pnl - self.fees
+
+    @property
+    def drawdown(self):
+        """
+        Current drop of total PnL below its high-water mark.
+
+        Returns:
+            float: high_water_mark - total_pnl, never negative
+        """
+        return self.high_water_mark - self.total_pnl
+
+    def position(self, pair):
+        """
+        Return the running position state of a trading pair, creating it if needed.
+
+        Args:
+            pair (str): The trading pair symbol (e.g., 'USDT_BTC')
+
+        Returns:
+            Position: The position object for the pair
+        """
+        position = self.positions.get(pair)
+        if position is None:
+            position = self.positions[pair] = Position()
+            self._pair_index[pair] = len(self.pairs)
+            self.pairs.append(pair)
+        return position
+
+    def fill(self, pair, action, amount, price, date=0.0):
+        """
+        Record an executed order and update the running state of its pair.
+
+        Buys add the amount net of the fee to the position, as the game
+        delivers the coins bought minus the fee, and sells reduce it. Closed
+        quantity realizes (price - average_price) profit, and the fee of the
+        fill notional is booked using fee_percent. The bot cannot short, so a
+        sell beyond the open quantity only closes the position: the excess
+        comes from coins held before the ledger started, whose entry price is
+        unknown.
+
+        Args:
+            pair (str): The trading pair symbol (e.g., 'USDT_BTC')
+            action (str): Either "buy" or "sell"
+            amount (float): Quantity of the traded currency
+            price (float): Execution price
+            date (float, optional): Timestamp of the fill (default is 0.0)
+
+        Returns:
+            None
+        """
+        side = BUY if action == "buy" else SELL
+        position = self.position(pair)
+        fee = amount * price * self.fee_percent / 100
+
+        self._pair.append(self._pair_index[pair])
+        self._side.append(side)
+        self._amount.append(amount)
+        self._price.append(price)
+        self._fee.append(fee)
+        self._date.append(date)
+
+        if side == BUY:
+            # the fee is withheld from the coins delivered, as in the game
+            net = amount * (1 - self.fee_percent / 100)
+            total = position.quantity + net
+            if total > 0:
+                position.average_price = (position.quantity * position.average_price + net * price) / total
+            position.quantity = total
+        else:
+            closed = min(position.quantity, amount)
+            realized = (price - position.average_price) * closed
+            position.realized_pnl += realized
+            self.realized_pnl += realized
+            position.quantity -= closed
+            if position.quantity <= closed * DUST:
+                # sold the whole stack, up to the rounding of the game stacks
+                position.quantity = 0.0
+                position.average_price = 0.0
+
+        position.fees += fee
+        self.fees += fee
+        self.mark(pair, price)
+
+    def mark(self, pair, price):
+        """
+        Revalue the open position of a pair at a new price.
+
+        Updates the unrealized PnL of the pair and of the ledger, then the
+        high-water mark and maximum drawdown of the total PnL.
+
+        Args:
+            pair (str): The trading pair symbol (e.g., 'USDT_BTC')
+            price (float): The latest price of the pair (usually the candle close)
+
+        Returns:
+            None
+        """
+        position = self.position(pair)
+        position.last_price = price
+        unrealized = (price - position.average_price) * position.quantity
+        self.unrealized_pnl += unrealized - position.unrealized_pnl
+        position.unrealized_pnl = unrealized
+
+        total = self.total_pnl
+        if total > self.high_water_mark:
+            self.high_water_mark = total
+        elif self.high_water_mark - total > self.max_drawdown:
+            self.max_drawdown = self.high_water_mark - total
+
+    def fills(self):
+        """
+        Iterate over the recorded fills in execution order.
+
+        Yields:
+            tuple: (action, pair, amount, price, fee, date) for each fill
+        """
+        for i in range(len(self._side)):
+            yield ("buy" if self._side[i] == BUY else "sell", self.pairs[self._pair[i]],
+                   self._amount[i], self._price[i], self._fee[i], self._date[i])
@@ -1,7 +1,11 @@
 import sys
 from .debug import Debugger
+from .ledger import Ledger
 from .model import LinearRegression
+from .online import PREDICTORS
 from .indicators import Indicators
+from .ring import RingBuffer
+from .streaming import StreamingIndicators
 
 class MarketData(Indicators):
     """
@@ -13,31 +17,57 @@ class MarketData(Indicators):
     - Implementing money management strategies
     - Calculating technical indicators
     - Generating trading signals
-    
+
+    By default the indicators are updated incrementally by a StreamingIndicators
+    per pair, which keeps its own running state, and only the last candle is
+    retained, so memory and per-candle cost do not grow with the length of the
+    game. The Indicators methods need the full history and raise RuntimeError
+    once the ring buffers have dropped candles. With retention=None the full history is kept and every
+    indicator is recomputed from it on each candle.
+
+    Args:
+        retention (int, str or None): Number of candles kept per pair in ring buffers,
+            'auto' for the last candle only, None to keep everything
+
     Attributes:
         data (dict): Dictionary storing market data for different trading pairs
         list_buys (list): List tracking buy orders
         list_sells (list): List tracking sell orders
         debug (Debugger): Debugger instance for logging
-        trade_history (list): List storing historical trade records
+        output (file): Stream receiving the orders, standard output if None
+        ledger (Ledger): Fill log with running position and PnL for each trading pair
+        take_profit (float): Position return at which money management takes profit
+        stop_loss (float): Position loss, as a positive ratio, at which money management cuts the trade
+        predictor (str): Price predictor used by the signals: 'regression', 'rls' or 'kalman'
+        predictors (dict): Online predictor of each trading pair, when predictor is not 'regression'
+            and the full history is kept
+        streams (dict): Incremental indicator state of each trading pair, when history is bounded
 
     Methods:
         add_data: Add market data for a specific trading pair
         order: Execute and record a trade order
-        money_management: Manage trading decisions based on asset value
+        trade_history: Historical trade records read back from the ledger
+        money_management: Manage trading decisions based on position PnL
         indicators_signal: Calculate technical indicators for a trading pair
         buy_or_sell_signal: Generate trading signals based on technical analysis
         >>> market = MarketData()
-        >>> market.add_data('BTC/USD', datetime.now(), 50000.0, 49000.0, 49500.0, 49800.0, 100.5)
+        >>> market.add_data('BTC/USD', 1622548800.0, 50000.0, 49000.0, 49500.0, 49800.0, 100.5)
         >>> market.order('buy', 'BTC/USD', 0.5)
 
     """
-    def __init__(self):
+    def __init__(self, retention='auto'):
+        self.retention = retention
+        self.streams = {}
         self.data = {}
         self.list_buys = []
         self.list_sells = []
         self.debug = Debugger()
-        self.trade_history = []
+        self.output = None
+        self.ledger = Ledger()
+        self.take_profit = 0.5
+        self.stop_loss = 0.2
+        self.predictor = 'regression'
+        self.predictors = {}
 
     def add_data(self, pair, date, high, low, open_p, close, volume):
         """
@@ -45,7 +75,9 @@ class MarketData(Indicators):
 
         This method adds price and volume data for a given trading pair to the market data structure.
         If the pair doesn't exist in the data dictionary, it initializes the data structure for that pair
-        with empty lists for various technical indicators.
+        with empty lists for various technical indicators. When history is bounded, price and volume
+        columns are ring buffers sized by the retention policy and the indicator state of the pair
+        is updated with the new candle; the signals only read the last candle of the columns.
 
         Args:
             pair (str): The trading pair identifier (e.g., 'BTC/USD')
@@ -60,16 +92,22 @@ class MarketData(Indicators):
             None
 
         Example:
-            market.add_data('BTC/USD', datetime.now(), 50000.0, 49000.0, 49500.0, 49800.0, 100.5)
+            market.add_data('BTC/USD', 1622548800.0, 50000.0, 49000.0, 49500.0, 49800.0, 100.5)
         """
         if pair not in self.data:
+            if self.retention is None:
+                column = list
+            else:
+                self.streams[pair] = StreamingIndicators(predictor=self.predictor)
+                size = 1 if self.retention == 'auto' else self.retention
+                column = lambda: RingBuffer(size)
             self.data[pair] = {
-                'date': [],
-                'high': [],
-                'low': [],
-                'open': [],
-                'close': [],
-                'volume': [],
+                'date': column(),
+                'high': column(),
+                'low': column(),
+                'open': column(),
+                'close': column(),
+                'volume': column(),
                 'bollinger': {'upper': [], 'lower': []},
                 'ema': [],
                 'mcginley': []
@@ -80,13 +118,59 @@ class MarketData(Indicators):
         self.data[pair]['open'].append(open_p)
         self.data[pair]['close'].append(close)
         self.data[pair]['volume'].append(volume)
+        self.ledger.mark(pair, close)
+        if self.retention is not None:
+            self.streams[pair].update([high], [low], [close])
+        elif self.predictor in PREDICTORS:
+            if pair not in self.predictors:
+                self.predictors[pair] = PREDICTORS[self.predictor]()
+            self.predictors[pair].update(close)
+
+    def _full_history(self, pair, method):
+        self._whole(self.data[pair]['close'], method)
+
+    @staticmethod
+    def _whole(array, method):
+        if isinstance(array, RingBuffer) and array.count > array.capacity:
+            raise RuntimeError(f"{method} needs the full history, but the RingBuffer dropped "
+                               f"{array.count - array.capacity} values; use MarketData(retention=None)")
+
+    def moving_average(self, array, period):
+        """Indicators.moving_average, refusing a ring buffer that dropped values."""
+        self._whole(array, 'moving_average')
+        return super().moving_average(array, period)
+
+    def standard_deviation(self, array, period):
+        """Indicators.standard_deviation, refusing a ring buffer that dropped values."""
+        self._whole(array, 'standard_deviation')
+        return super().standard_deviation(array, period)
+
+    def smoothed_moving_average(self, array, period):
+        """Indicators.smoothed_moving_average, refusing a ring buffer that dropped values."""
+        self._whole(array, 'smoothed_moving_average')
+        return super().smoothed_moving_average(array, period)
+
+    def exponential_moving_average(self, pair, window):
+        """Indicators.exponential_moving_average, while the ring buffers of the pair hold every candle."""
+        self._full_history(pair, 'exponential_moving_average')
+        return super().exponential_moving_average(pair, window)
+
+    def ADX_indicator(self, pair, period=14):
+        """Indicators.ADX_indicator, while the ring buffers of the pair hold every candle."""
+        self._full_history(pair, 'ADX_indicator')
+        return super().ADX_indicator(pair, period)
+
+    def bollinger_bands(self, pair, period=20, deviation=2):
+        """Indicators.bollinger_bands, while the ring buffers of the pair hold every candle."""
+        self._full_history(pair, 'bollinger_bands')
+        return super().bollinger_bands(pair, period, deviation)
 
     def order(self, action, pair, amount):
         """
-        Executes a trade order and records it in the trade history.
+        Executes a trade order and records it in the ledger.
 
         This method simulates placing a buy or sell order for a given trading pair and amount.
-        It prints the order details and stores the transaction in the trade history.
+        It prints the order details and records the fill at the last closing price.
 
         Args:
             action (str): The type of order - either "buy" or "sell"
@@ -100,18 +184,26 @@ class MarketData(Indicators):
             >>> market.order("buy", "BTC/USD", 0.5)
             buy BTC/USD 0.5
         """
-        print(f'{action} {pair} {amount}', flush=True)
-        if action == "buy":
-            self.trade_history.append(("buy", pair, amount, self.data[pair]['close'][-1]))
-        elif action == "sell":
-            self.trade_history.append(("sell", pair, amount, self.data[pair]['close'][-1]))
+        print(f'{action} {pair} {amount}', file=self.output, flush=True)
+        if action in ("buy", "sell"):
+            self.ledger.fill(pair, action, amount, self.data[pair]['close'][-1], self.data[pair]['date'][-1])
+
+    @property
+    def trade_history(self):
+        """
+        List of historical trade records, read back from the ledger fill log.
+
+        Returns:
+            list: (action, pair, amount, price) tuples in execution order
+        """
+        return [(action, pair, amount, price) for action, pair, amount, price, _, _ in self.ledger.fills()]
 
     def money_management(self, pair, sell_stack, buy_stack, asset):
         """
-        Manages trading decisions based on asset value and trading stack status.
+        Manages trading decisions based on the profit of the open position.
 
-        This method implements a basic money management strategy by enforcing take profit 
-        and stop loss rules based on asset value thresholds.
+        This method implements a basic money management strategy by enforcing take profit
+        and stop loss rules on the position return tracked by the ledger.
 
         Parameters:
             pair (str): The trading pair symbol (e.g., 'BTC/USD')
@@ -124,20 +216,25 @@ class MarketData(Indicators):
                 False if no trade was executed
 
         Details:
-            - Takes profit when asset value >= 1500 and there are open buy positions
-            - Stops loss when asset value <= 800 and there are open buy positions
+            - Takes profit when the position return is >= take_profit and there are open buy positions
+            - Stops loss when the position return is <= -stop_loss and there are open buy positions
             - Clears buy positions and records sell operations after execution
         """
-        if asset >= 1500 and len(self.list_buys) > 0:
+        position = self.ledger.position(pair)
+        ratio = position.return_ratio
+        if ratio is None or len(self.list_buys) == 0:
+            return False
+
+        if ratio >= self.take_profit:
             self.order("sell", pair, sell_stack)
-            self.debug.print(f"Selling due to take profit: {self.list_buys}, Asset: {asset}")
+            self.debug.print(f"Selling due to take profit: {self.list_buys}, PnL: {position.unrealized_pnl:.2f}, Asset: {asset}")
             self.list_sells.append("sell")
             self.list_buys.clear()
             return True
 
-        if asset <= 800 and len(self.list_buys) > 0:
+        if ratio <= -self.stop_loss:
             self.order("sell", pair, sell_stack)
-            self.debug.print(f"Selling due to stop loss: {self.list_buys}, Asset: {asset}")
+            self.debug.print(f"Selling due to stop loss: {self.list_buys}, PnL: {position.unrealized_pnl:.2f}, Asset: {asset}")
             self.list_sells.append("sell")
             self.list_buys.clear()
             return True
@@ -149,7 +246,7 @@ class MarketData(Indicators):
         Calculate and return various technical indicators for a given trading pair.
         This method computes several technical analysis indicators including:
         - Simple Moving Average (SMA)
-        - Linear Regression prediction
+        - Price prediction, from the linear regression or the online predictor
         - ADX (Average Directional Index) components
         - Bollinger Bands
         - Exponential Moving Average (EMA)
@@ -162,18 +259,34 @@ class MarketData(Indicators):
         tuple
         A tuple containing the following indicators in order:
             - em50 (float): 50-period Simple Moving Average
-            - prediction (float): Linear regression predicted value
+            - prediction (float): Predicted value, from the expanding-window linear regression
+              or, if predictor is 'rls' or 'kalman', from the online predictor of the pair
             - DIplus (float): Positive Directional Indicator
             - DIminus (float): Negative Directional Indicator 
             - upper (float): Upper Bollinger Band
             - lower (float): Lower Bollinger Band
             - ema50_r (float): 50-period Exponential Moving Average
+
+        When history is bounded, the values come from the incremental state of the pair and
+        em50 / ema50_r only hold the previous and current values. Until every indicator is
+        defined, em50 is [None] so that no move is made.
         """
+        if self.retention is not None:
+            stream = self.streams[pair]
+            if not stream.ready:
+                return [None], None, None, None, None, None, None
+            return ([stream.smma_prev[0], stream.smma[0]], stream.prediction[0], stream.di_plus[0],
+                    stream.di_minus[0], stream.upper[0], stream.lower[0], [stream.ema_prev[0], stream.ema[0]])
+
         close_prices = self.data[pair]['close']
-        lr = LinearRegression(close_prices, len(close_prices))
-        a, b = lr.calculate_m_b()
-        prediction = lr.predictive_value(a, b, len(close_prices) + 1)
-        rmse = lr.rmse(a, b)
+        if self.predictor == 'regression':
+            lr = LinearRegression(close_prices, len(close_prices))
+            a, b = lr.calculate_m_b()
+            prediction = lr.predictive_value(a, b, len(close_prices) + 1)
+            rmse = lr.rmse(a, b)
+        else:
+            # same horizon as the regression, which predicts x = n + 1 from a last point at x = n - 1
+            prediction = self.predictors[pair].predict(2)
         
         em50 = self.smoothed_moving_average(close_prices, 50)
         ADX, DIplus, DIminus = self.ADX_indicator(pair, 100)
@@ -222,14 +335,14 @@ class MarketData(Indicators):
         em50, prediction, DIplus, DIminus, upper, lower, ema50_r = self.indicators_signal(pair)
 
         if None in em50:
-            print("no_moves", flush=True)
+            print("no_moves", file=self.output, flush=True)
             return
 
         current_price = self.data[pair]['close'][-1]
         can_buy = buy_stack / current_price / 1
 
         if len(self.list_buys) > 0 or len(self.list_sells) > 0:
-            print("no_moves", flush=True)
+            print("no_moves", file=self.output, flush=True)
             return
 
         if current_price > lower and DIplus > DIminus \
@@ -248,4 +361,4 @@ class MarketData(Indicators):
             self.debug.print(f"Selling: {len(self.list_sells)}")
             self.order("sell", pair, sell_stack)
         else:
-            print("no_moves", flush=True)
+            print("no_moves", file=self.output, flush=True)
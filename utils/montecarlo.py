@@ -0,0 +1,328 @@
+import argparse
+import os
+import random
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+from math import exp, log
+
+from .backtest import Backtester
+from .dataset import load_candles
+
+
+def candle_ratios(candles):
+    """
+    Express each candle relative to the previous close.
+
+    Parameters
+    ----------
+    candles : dict
+        Columns of one pair, as returned by load_candles
+
+    Returns
+    -------
+    list
+        (close, high, low) / previous close tuples, one per candle after the first
+    """
+    closes = candles['close']
+    return [(c / pc, h / pc, lo / pc)
+            for pc, h, lo, c in zip(closes, candles['high'][1:], candles['low'][1:], closes[1:])]
+
+
+def block_bootstrap(sources, n_paths, n_candles, block_size, start_price, rng):
+    """
+    Generate price paths by chaining random blocks of historical candle ratios.
+
+    Blocks of block_size consecutive candles are drawn with replacement from
+    the sources, so short-range dependence (volatility clustering, trends
+    inside a block) is preserved while the order of blocks is shuffled.
+
+    Parameters
+    ----------
+    sources : list
+        Lists of candle ratios, one per dataset, as returned by candle_ratios
+    n_paths : int
+        Number of paths to generate
+    n_candles : int
+        Number of candles per path
+    block_size : int
+        Number of consecutive candles per block
+    start_price : float
+        Close price before the first candle of every path
+    rng : random.Random
+        Random number generator
+
+    Returns
+    -------
+    tuple[list, list, list]
+        Highs, lows and closes as a 2-D layout: one tuple per candle holding
+        the value of every path
+    """
+    starts = [(ratios, offset) for ratios in sources for offset in range(len(ratios) - block_size + 1)]
+    if not starts:
+        raise ValueError(f"No source has {block_size} candles for a block")
+    rows = []
+    for _ in range(n_paths):
+        ratios = []
+        while len(ratios) < n_candles:
+            source, offset = rng.choice(starts)
+            ratios.extend(source[offset:offset + block_size])
+        del ratios[n_candles:]
+        rows.append(_build_path(ratios, start_price))
+    return _transpose(rows)
+
+
+def gbm_parameters(sources):
+    """
+    Calibrate geometric Brownian motion and candle wicks on historical candle ratios.
+
+    Parameters
+    ----------
+    sources : list
+        Lists of candle ratios, one per dataset, as returned by candle_ratios
+
+    Returns
+    -------
+    tuple[float, float, float, float]
+        Mean and standard deviation of the log return per candle, and mean log
+        size of the upper and lower wicks beyond the candle body
+    """
+    ratios = [ratio for source in sources for ratio in source]
+    returns = [log(c) for c, _, _ in ratios]
+    upper = statistics.mean(log(h / max(c, 1.0)) for c, h, _ in ratios)
+    lower = statistics.mean(log(min(c, 1.0) / lo) for c, _, lo in ratios)
+    return statistics.mean(returns), statistics.stdev(returns), max(upper, 0.0), max(lower, 0.0)
+
+
+def geometric_brownian_motion(parameters, n_paths, n_candles, start_price, rng):
+    """
+    Generate price paths following a geometric Brownian motion.
+
+    Log returns are drawn from a normal distribution, and the high and low of
+    each candle extend beyond its body by exponentially distributed wicks.
+
+    Parameters
+    ----------
+    parameters : tuple
+        Calibration returned by gbm_parameters
+    n_paths : int
+        Number of paths to generate
+    n_candles : int
+        Number of candles per path
+    start_price : float
+        Close price before the first candle of every path
+    rng : random.Random
+        Random number generator
+
+    Returns
+    -------
+    tuple[list, list, list]
+        Highs, lows and closes, one tuple per candle holding the value of every path
+    """
+    mu, sigma, upper, lower = parameters
+    rows = []
+    for _ in range(n_paths):
+        ratios = []
+        for _ in range(n_candles):
+            c = exp(rng.gauss(mu, sigma))
+            h = max(c, 1.0) * (exp(rng.expovariate(1 / upper)) if upper else 1.0)
+            lo = min(c, 1.0) / (exp(rng.expovariate(1 / lower)) if lower else 1.0)
+            ratios.append((c, h, lo))
+        rows.append(_build_path(ratios, start_price))
+    return _transpose(rows)
+
+
+def _build_path(ratios, start_price):
+    closes = list(accumulate((c for c, _, _ in ratios), lambda p, r: p * r, initial=start_price))
+    highs = [pc * h for pc, (_, h, _) in zip(closes, ratios)]
+    lows = [pc * lo for pc, (_, _, lo) in zip(closes, ratios)]
+    return highs, lows, closes[1:]
+
+
+def _transpose(rows):
+    highs, lows, closes = zip(*rows)
+    return list(zip(*highs)), list(zip(*lows)), list(zip(*closes))
+
+
+def simulate_chunk(task):
+    """
+    Generate one chunk of paths and backtest the strategy on all of them.
+
+    This is the unit of work sent to the process pool; paths are generated in
+    the worker so only the parameters and the results cross process boundaries.
+
+    Parameters
+    ----------
+    task : tuple
+        (method, sources or gbm parameters, n_paths, n_candles, block_size,
+        start_price, seed, backtest keyword arguments)
+
+    Returns
+    -------
+    tuple[list, list]
+        Total return and maximum drawdown of each path
+    """
+    method, source, n_paths, n_candles, block_size, start_price, seed, options = task
+    rng = random.Random(seed)
+    if method == 'bootstrap':
+        highs, lows, closes = block_bootstrap(source, n_paths, n_candles, block_size, start_price, rng)
+    else:
+        highs, lows, closes = geometric_brownian_motion(source, n_paths, n_candles, start_price, rng)
+    backtest = Backtester(n_paths, **options)
+    backtest.run(zip(highs, lows, closes))
+    return backtest.returns(closes[-1]), backtest.max_drawdown
+
+
+def summarize(values):
+    """
+    Describe a distribution of simulation results.
+
+    Parameters
+    ----------
+    values : list
+        One result per path
+
+    Returns
+    -------
+    dict
+        Mean, standard deviation, minimum, maximum and the 5th, 25th, 50th,
+        75th and 95th percentiles; with a single value every percentile is
+        that value and the standard deviation is 0
+    """
+    if len(values) > 1:
+        quantiles = statistics.quantiles(values, n=20, method='inclusive')
+    else:
+        quantiles = list(values) * 19
+    return {
+        'mean': statistics.mean(values),
+        'stdev': statistics.stdev(values) if len(values) > 1 else 0.0,
+        'min': min(values),
+        'p5': quantiles[0],
+        'p25': quantiles[4],
+        'p50': quantiles[9],
+        'p75': quantiles[14],
+        'p95': quantiles[18],
+        'max': max(values),
+    }
+
+
+class MonteCarlo:
+    """Run the trading strategy on synthetic price paths calibrated on datasets.
+
+    Paths are either block-bootstrapped from the candles of the source datasets
+    or drawn from a geometric Brownian motion calibrated on them. They are
+    generated and backtested in chunks, each chunk evaluated with all of its
+    paths vectorized in a Backtester, and chunks are spread over a process pool.
+
+    Parameters
+    ----------
+    datasets : list
+        Paths of the CSV datasets used for calibration
+    method : str, optional
+        'bootstrap' or 'gbm' (default is 'bootstrap')
+    n_paths : int, optional
+        Number of paths to simulate (default is 10000)
+    n_candles : int, optional
+        Number of candles per path (default is 2000)
+    block_size : int, optional
+        Candles per bootstrap block (default is 48)
+    chunk_size : int, optional
+        Paths per unit of work (default is 250)
+    workers : int, optional
+        Number of worker processes, os.cpu_count() if None, in-process if 1
+    seed : int, optional
+        Seed of the random number generators (default is 0)
+    **options
+        Keyword arguments passed to every Backtester
+
+    Examples
+    --------
+    >>> mc = MonteCarlo(['datasets/training-set_USDT_BTC-1.csv'], n_paths=1000)
+    >>> report = mc.run()
+    >>> report['return']['p50']
+    """
+    def __init__(self, datasets, method='bootstrap', n_paths=10000, n_candles=2000, block_size=48,
+                 chunk_size=250, workers=None, seed=0, **options):
+        if method not in ('bootstrap', 'gbm'):
+            raise ValueError(f"Unknown path generator: {method}")
+        if n_paths < 1:
+            raise ValueError("MonteCarlo needs at least one path")
+        if n_candles < 1:
+            raise ValueError("MonteCarlo paths need at least one candle")
+        self.method = method
+        self.n_paths = n_paths
+        self.n_candles = n_candles
+        self.block_size = block_size
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count()
+        self.seed = seed
+        self.options = options
+
+        self.sources = []
+        for path in datasets:
+            for candles in load_candles(path).values():
+                if not self.sources:
+                    self.start_price = candles['close'][0]
+                self.sources.append(candle_ratios(candles))
+        if method == 'gbm':
+            self.parameters = gbm_parameters(self.sources)
+
+    def tasks(self):
+        """
+        Split the simulation into chunks for the process pool.
+
+        Returns:
+            list: One simulate_chunk task per chunk, each with its own seed
+        """
+        source = self.sources if self.method == 'bootstrap' else self.parameters
+        tasks = []
+        for index, first in enumerate(range(0, self.n_paths, self.chunk_size)):
+            size = min(self.chunk_size, self.n_paths - first)
+            tasks.append((self.method, source, size, self.n_candles, self.block_size,
+                          self.start_price, self.seed * 1000003 + index, self.options))
+        return tasks
+
+    def run(self):
+        """
+        Simulate every path and report the distributions of the results.
+
+        Returns:
+            dict: summarize() of the total returns under 'return' and of the
+                maximum drawdowns under 'drawdown'
+        """
+        tasks = self.tasks()
+        if self.workers == 1 or len(tasks) == 1:
+            results = list(map(simulate_chunk, tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(simulate_chunk, tasks))
+        returns = [value for chunk_returns, _ in results for value in chunk_returns]
+        drawdowns = [value for _, chunk_drawdowns in results for value in chunk_drawdowns]
+        return {'return': summarize(returns), 'drawdown': summarize(drawdowns)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo robustness check of the trading strategy")
+    parser.add_argument('datasets', nargs='+', help="CSV datasets used to calibrate the paths")
+    parser.add_argument('--method', choices=('bootstrap', 'gbm'), default='bootstrap')
+    parser.add_argument('--paths', type=int, default=10000)
+    parser.add_argument('--candles', type=int, default=2000)
+    parser.add_argument('--block-size', type=int, default=48)
+    parser.add_argument('--chunk-size', type=int, default=250)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--coins', type=float, default=0)
+    parser.add_argument('--fee', type=float, default=0.2, help="transaction fee per order in percent")
+    parser.add_argument('--take-profit', type=float, default=0.5)
+    parser.add_argument('--stop-loss', type=float, default=0.2)
+    args = parser.parse_args()
+
+    mc = MonteCarlo(args.datasets, args.method, args.paths, args.candles, args.block_size,
+                    args.chunk_size, args.workers, args.seed, coins=args.coins, fee_percent=args.fee,
+                    take_profit=args.take_profit, stop_loss=args.stop_loss)
+    for name, summary in mc.run().items():
+        print(name + ' ' + ' '.join(f'{key}={value:.4f}' for key, value in summary.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+from math import sqrt
+
+
+class RecursiveLeastSquares:
+    """An online linear trend fit with exponential forgetting.
+
+    This class fits the same line as LinearRegression, y = level + slope * x,
+    but updates the fit in constant time per new price instead of refitting the
+    whole history, and discounts old prices by a forgetting factor so the fit
+    follows the recent trend. The line is kept relative to the latest price
+    (level is the fitted value at the last x), which keeps the 2x2 covariance
+    well conditioned however long the series gets.
+
+    Parameters
+    ----------
+    forgetting : float, optional
+        Weight kept by past observations at each update, between 0 and 1
+        (default is 0.98, an effective window of about 50 candles)
+    delta : float, optional
+        Initial covariance of the parameters, large for a diffuse start (default is 1e4)
+
+    Methods
+    -------
+    update(y)
+        Adds a new price to the fit.
+    predict(steps=1)
+        Predicts the price the given number of steps after the last one.
+    uncertainty(steps=1)
+        Standard deviation of the prediction error at that horizon.
+
+    Examples
+    --------
+    >>> rls = RecursiveLeastSquares(forgetting=0.95)
+    >>> for price in [100, 102, 104, 103, 106]:
+    ...     rls.update(price)
+    >>> rls.predict(1)
+    """
+    def __init__(self, forgetting=0.98, delta=1e4):
+        self.forgetting = forgetting
+        self.delta = delta
+        self.count = 0
+        self.level = 0.0
+        self.slope = 0.0
+        self.variance = 0.0
+        self._p = (delta, 0.0, delta)
+
+    def update(self, y):
+        """
+        Add a new price to the fit.
+
+        Parameters
+        ----------
+        y : float
+            The new price, one step after the previous one
+
+        Returns
+        -------
+        None
+        """
+        self.count += 1
+        if self.count == 1:
+            self.level = y
+            return
+        lam = self.forgetting
+        p00, p01, p11 = self._p
+        # move the origin to the new x: level <- level + slope, P <- A P A^T
+        self.level += self.slope
+        p00, p01 = p00 + 2 * p01 + p11, p01 + p11
+
+        error = y - self.level
+        denominator = lam + p00
+        k0, k1 = p00 / denominator, p01 / denominator
+        self.level += k0 * error
+        self.slope += k1 * error
+        self._p = ((p00 - k0 * p00) / lam, (p01 - k0 * p01) / lam, (p11 - k1 * p01) / lam)
+        self.variance = lam * self.variance + (1 - lam) * error * error * lam / denominator
+
+    def predict(self, steps=1):
+        """
+        Predict the price the given number of steps after the last one.
+
+        Parameters
+        ----------
+        steps : int, optional
+            Prediction horizon in candles (default is 1)
+
+        Returns
+        -------
+        float or None
+            The predicted price, None before the first update
+        """
+        if self.count == 0:
+            return None
+        return self.level + self.slope * steps
+
+    def uncertainty(self, steps=1):
+        """
+        Standard deviation of the prediction error at the given horizon.
+
+        Combines the residual variance of the fit with the uncertainty of the
+        fitted level and slope.
+
+        Parameters
+        ----------
+        steps : int, optional
+            Prediction horizon in candles (default is 1)
+
+        Returns
+        -------
+        float or None
+            The standard deviation, None before the second update
+        """
+        if self.count < 2:
+            return None
+        p00, p01, p11 = self._p
+        return sqrt(self.variance * (1 + p00 + 2 * steps * p01 + steps * steps * p11))
+
+
+class KalmanTrend:
+    """A local linear trend Kalman filter for price prediction.
+
+    The price is modelled as a level that drifts with a slope, both following
+    random walks, observed with noise:
+
+        price(t) = level(t) + noise
+        level(t) = level(t-1) + slope(t-1) + level noise
+        slope(t) = slope(t-1) + slope noise
+
+    The noise variances are given relative to the observation noise, and the
+    observation noise itself is estimated from the innovations, so the filter
+    works at any price scale. Each update takes constant time.
+
+    Parameters
+    ----------
+    level_ratio : float, optional
+        Variance of the level noise over the observation noise (default is 1.0)
+    slope_ratio : float, optional
+        Variance of the slope noise over the observation noise (default is 0.001)
+    prior : float, optional
+        Initial variance of level and slope, large for a diffuse start (default is 1e6)
+
+    Methods
+    -------
+    update(y)
+        Filters a new price.
+    predict(steps=1)
+        Predicts the price the given number of steps after the last one.
+    uncertainty(steps=1)
+        Standard deviation of the prediction error at that horizon.
+
+    Examples
+    --------
+    >>> kalman = KalmanTrend()
+    >>> for price in [100, 102, 104, 103, 106]:
+    ...     kalman.update(price)
+    >>> kalman.predict(2), kalman.uncertainty(2)
+    """
+    def __init__(self, level_ratio=1.0, slope_ratio=0.001, prior=1e6):
+        self.level_ratio = level_ratio
+        self.slope_ratio = slope_ratio
+        self.prior = prior
+        self.count = 0
+        self.level = 0.0
+        self.slope = 0.0
+        self.variance = 0.0
+        self._p = (prior, 0.0, prior)
+
+    def update(self, y):
+        """
+        Filter a new price.
+
+        Parameters
+        ----------
+        y : float
+            The new price, one step after the previous one
+
+        Returns
+        -------
+        None
+        """
+        self.count += 1
+        if self.count == 1:
+            self.level = y
+            return
+        p00, p01, p11 = self._p
+        self.level += self.slope
+        p00, p01, p11 = p00 + 2 * p01 + p11 + self.level_ratio, p01 + p11, p11 + self.slope_ratio
+
+        error = y - self.level
+        innovation = p00 + 1
+        k0, k1 = p00 / innovation, p01 / innovation
+        self.level += k0 * error
+        self.slope += k1 * error
+        self._p = (p00 - k0 * p00, p01 - k0 * p01, p11 - k1 * p01)
+        self.variance += (error * error / innovation - self.variance) / (self.count - 1)
+
+    def predict(self, steps=1):
+        """
+        Predict the price the given number of steps after the last one.
+
+        Parameters
+        ----------
+        steps : int, optional
+            Prediction horizon in candles (default is 1)
+
+        Returns
+        -------
+        float or None
+            The predicted price, None before the first update
+        """
+        if self.count == 0:
+            return None
+        return self.level + self.slope * steps
+
+    def uncertainty(self, steps=1):
+        """
+        Standard deviation of the prediction error at the given horizon.
+
+        Parameters
+        ----------
+        steps : int, optional
+            Prediction horizon in candles (default is 1)
+
+        Returns
+        -------
+        float or None
+            The standard deviation, None before the second update
+        """
+        if self.count < 2:
+            return None
+        p00, p01, p11 = self._p
+        for _ in range(steps):
+            p00, p01, p11 = p00 + 2 * p01 + p11 + self.level_ratio, p01 + p11, p11 + self.slope_ratio
+        return sqrt(self.variance * (p00 + 1))
+
+
+PREDICTORS = {
+    'rls': RecursiveLeastSquares,
+    'kalman': KalmanTrend,
+}
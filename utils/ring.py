@@ -0,0 +1,71 @@
+from array import array
+
+
+class RingBuffer:
+    """A fixed-size buffer of floats keeping only the most recent values.
+
+    Values are stored in a preallocated array('d') and overwritten in a circle,
+    so appending is constant time and memory never grows. Indexing and slicing
+    behave like a list holding the retained values, oldest first, so code
+    written for the full history lists (e.g. closes[-1] or closes[-period:])
+    works unchanged on the window.
+
+    Parameters
+    ----------
+    capacity : int
+        Number of values retained
+
+    Attributes
+    ----------
+    count : int
+        Number of values appended since creation, including dropped ones
+
+    Examples
+    --------
+    >>> ring = RingBuffer(3)
+    >>> for value in [1, 2, 3, 4]:
+    ...     ring.append(value)
+    >>> ring[-1], ring[:], len(ring)
+    (4.0, [2.0, 3.0, 4.0], 3)
+    """
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("RingBuffer capacity must be at least 1")
+        self.capacity = capacity
+        self.count = 0
+        self._values = array('d', bytes(8 * capacity))
+
+    def append(self, value):
+        """
+        Add a value, dropping the oldest one when the buffer is full.
+
+        Args:
+            value (float): The value to add
+
+        Returns:
+            None
+        """
+        self._values[self.count % self.capacity] = value
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def __iter__(self):
+        if self.count <= self.capacity:
+            return iter(self._values[:self.count])
+        start = self.count % self.capacity
+        return iter(self._values[start:] + self._values[:start])
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return list(self)[key]
+        size = len(self)
+        if key < 0:
+            key += size
+        if not 0 <= key < size:
+            raise IndexError("RingBuffer index out of range")
+        return self._values[(self.count - size + key) % self.capacity]
+
+    def __repr__(self):
+        return f'RingBuffer({list(self)!r}, capacity={self.capacity})'
@@ -0,0 +1,164 @@
+import asyncio
+import io
+
+from .debug import Debugger
+from .trade import Trader
+
+
+class Session:
+    """A single game hosted by the server.
+
+    Each session owns its own Trader, and therefore its own Settings and
+    MarketData, so games never share state. Orders written by the bot are
+    collected in a buffer and handed back after each command.
+
+    Args:
+        predictor (str, optional): Price predictor of the bot (default is 'regression')
+
+    Attributes:
+        trader (Trader): The bot instance playing this game
+        commands (int): Number of commands processed so far
+
+    Example:
+        >>> session = Session()
+        >>> session.feed("settings candles_given 337")
+        ''
+    """
+    def __init__(self, predictor='regression'):
+        self._buffer = io.StringIO()
+        self.trader = Trader(output=self._buffer, predictor=predictor)
+        self.commands = 0
+
+    def feed(self, command):
+        """
+        Process one line of the game protocol.
+
+        Args:
+            command (str): A command as read from standard input by Trader.run
+
+        Returns:
+            str: The lines written by the bot in response, empty if none
+        """
+        command = command.strip()
+        if not command:
+            return ''
+        self.commands += 1
+        self.trader.parse(command)
+        output = self._buffer.getvalue()
+        if output:
+            self._buffer.seek(0)
+            self._buffer.truncate()
+        return output
+
+
+class BotServer:
+    """Host many games in one process, one connection per game.
+
+    Every connection speaks the same line protocol as standard input in
+    Trader.run, and gets the bot orders back on the same connection. Sessions
+    are multiplexed on a single asyncio event loop, so hundreds of games share
+    one interpreter and its imports instead of starting a process each.
+
+    Parameters
+    ----------
+    host : str, optional
+        Address to listen on for TCP connections (default is '127.0.0.1')
+    port : int, optional
+        TCP port to listen on (default is 8765)
+    path : str, optional
+        Unix socket path to listen on instead of TCP
+    predictor : str, optional
+        Price predictor of the hosted bots (default is 'regression')
+
+    Attributes
+    ----------
+    sessions : dict
+        Active sessions, keyed by connection peer
+    served : int
+        Number of sessions completed since the server started
+
+    Examples
+    --------
+    >>> BotServer(path='/tmp/trade.sock').run()
+    """
+    limit = 1 << 24
+    backlog = 1024
+
+    def __init__(self, host='127.0.0.1', port=8765, path=None, predictor='regression'):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.predictor = predictor
+        self.sessions = {}
+        self.served = 0
+        self.debug = Debugger()
+
+    async def handle(self, reader, writer):
+        """
+        Play one game over a connection until the client closes it.
+
+        Parameters
+        ----------
+        reader : asyncio.StreamReader
+            Incoming protocol lines
+        writer : asyncio.StreamWriter
+            Outgoing bot orders
+
+        Returns
+        -------
+        None
+        """
+        peer = writer.get_extra_info('peername') or id(writer)
+        session = self.sessions[peer] = Session(self.predictor)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                output = session.feed(line.decode())
+                if output:
+                    writer.write(output.encode())
+                    await writer.drain()
+        except Exception as error:
+            # a broken connection or a malformed line only ends this game
+            self.debug.print(f"Session {peer} dropped: {type(error).__name__}: {error}")
+        finally:
+            del self.sessions[peer]
+            self.served += 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self):
+        """
+        Listen for connections and serve them until cancelled.
+
+        Returns
+        -------
+        None
+        """
+        if self.path:
+            server = await asyncio.start_unix_server(self.handle, self.path, limit=self.limit,
+                                                     backlog=self.backlog)
+            self.debug.print(f"Serving games on {self.path}")
+        else:
+            server = await asyncio.start_server(self.handle, self.host, self.port, limit=self.limit,
+                                                backlog=self.backlog)
+            self.debug.print(f"Serving games on {self.host}:{self.port}")
+        async with server:
+            await server.serve_forever()
+
+    def run(self):
+        """
+        Run the server on a new event loop until interrupted.
+
+        Returns
+        -------
+        None
+        """
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
@@ -18,6 +18,7 @@ class Settings:
         transaction_fee_percent (float): Fee percentage for each transaction.
         stack (dict): Current amounts of different currencies.
         market_data (MarketData): Object storing market data information.
+        bus (CandleBus): Shared memory bus receiving the candles instead of market_data, if set.
 
     Methods:
         update_settings(settings): Updates game settings based on key-value pairs.
@@ -35,6 +36,7 @@ class Settings:
         self.transaction_fee_percent = 0
         self.stack = {}
         self.market_data = MarketData()
+        self.bus = None
 
     def update_settings(self, settings):
         """
@@ -71,6 +73,9 @@ class Settings:
             self.initial_stack = float(value)
         elif key == 'transaction_fee_percent':
             self.transaction_fee_percent = float(value)
+            self.market_data.ledger.fee_percent = self.transaction_fee_percent
+            if self.bus is not None:
+                self.bus.fee_percent = self.transaction_fee_percent
         elif key == 'timebank':
             self.time_bank = int(value)
             self.max_time_bank = int(value)
@@ -103,6 +108,8 @@ class Settings:
         -------
         self.market_data : MarketData
             Updates with new candle data when processing 'next_candles'
+        self.bus : CandleBus
+            Receives the new candle data instead of market_data, when set
         self.stack : dict
             Updates currency amounts when processing 'stacks'
         """
@@ -112,7 +119,10 @@ class Settings:
                 data = candle.split(',')
                 pair, date, high, low, open_p, close, volume = data
                 date, high, low, open_p, close, volume = map(float, [date, high, low, open_p, close, volume])
-                self.market_data.add_data(pair, date, high, low, open_p, close, volume)
+                if self.bus is not None:
+                    self.bus.publish(pair, (date, high, low, open_p, close, volume))
+                else:
+                    self.market_data.add_data(pair, date, high, low, open_p, close, volume)
         elif updates[0] == 'stacks':
             stacks = updates[1].split(',')
             for stack in stacks:
@@ -0,0 +1,288 @@
+from math import fsum, sqrt
+
+from .online import PREDICTORS
+
+# version of the computed series, part of the key of the stored features;
+# bump it with any change to the values an indicator update produces
+VERSION = 1
+
+
+class StreamingIndicators:
+    """Incremental versions of the indicators used by MarketData.indicators_signal.
+
+    Instead of recomputing every indicator over the whole close history on each
+    candle, this class keeps the running state of each indicator and updates it
+    in constant time per candle. The state is held for several independent
+    lanes at once (e.g. one lane per simulated price path); every update takes
+    one value per lane and advances all lanes with a single list comprehension
+    per step, so the work is vectorized along the lane axis.
+
+    The values follow the reference implementations in Indicators and
+    LinearRegression: SMMA and EMA seeded from the first period, Wilder
+    smoothing for ADX/DI, population standard deviation for Bollinger Bands and
+    an expanding-window least squares fit for the prediction.
+
+    Parameters
+    ----------
+    lanes : int
+        Number of independent series updated together
+    smma_period : int, optional
+        Period of the smoothed moving average (default is 50)
+    ema_period : int, optional
+        Period of the exponential moving average (default is 50)
+    adx_period : int, optional
+        Period of the ADX and directional indicators (default is 100)
+    bollinger_period : int, optional
+        Period of the Bollinger Bands (default is 20)
+    bollinger_deviation : float, optional
+        Width of the Bollinger Bands in standard deviations (default is 2)
+    predictor : str, optional
+        'regression' for the expanding-window fit, or 'rls' / 'kalman' for an
+        online predictor per lane (default is 'regression')
+
+    Attributes
+    ----------
+    count : int
+        Number of candles processed so far
+    smma, smma_prev : list
+        Current and previous smoothed moving average of each lane
+    ema, ema_prev : list
+        Current and previous exponential moving average of each lane
+    prediction : list
+        Price prediction of each lane, two candles ahead like LinearRegression in indicators_signal
+    di_plus, di_minus, adx : list
+        Directional indicators and Average Directional Index of each lane
+    upper, middle, lower : list
+        Bollinger Bands of each lane
+    std : list
+        Standard deviation of the closes over the Bollinger period of each lane
+
+    Examples
+    --------
+    >>> stream = StreamingIndicators(lanes=2)
+    >>> for high, low, close in candles:
+    ...     stream.update(high, low, close)
+    >>> buys, sells = stream.signals(close)
+    """
+    def __init__(self, lanes=1, smma_period=50, ema_period=50, adx_period=100,
+                 bollinger_period=20, bollinger_deviation=2, predictor='regression'):
+        self.lanes = lanes
+        self.smma_period = smma_period
+        self.ema_period = ema_period
+        self.adx_period = adx_period
+        self.bollinger_period = bollinger_period
+        self.bollinger_deviation = bollinger_deviation
+        self.predictor = predictor
+        self.count = 0
+
+        zeros = [0.0] * lanes
+        self.smma = self.smma_prev = zeros
+        self.ema = self.ema_prev = zeros
+        self.prediction = zeros
+        self.di_plus = self.di_minus = self.adx = zeros
+        self.upper = self.middle = self.lower = self.std = zeros
+
+        self._sum_y = self._sum_xy = zeros
+        self._models = [PREDICTORS[predictor]() for _ in range(lanes)] if predictor != 'regression' else None
+        self._smma_sum = zeros
+        self._ema_seed = []
+        self._ema_state = zeros
+        self._prev = None
+        self._tr = self._dm_plus = self._dm_minus = zeros
+        self._dx = zeros
+        self._ring = [None] * bollinger_period
+        self._offset = zeros
+        self._sum = self._sum_sq = zeros
+
+    @property
+    def warmup(self):
+        """
+        Number of candles needed before every indicator used by the signals is defined.
+
+        Returns:
+            int: The minimum candle count for ready to be True
+        """
+        return max(self.smma_period + 1, self.ema_period + 2, self.bollinger_period,
+                   2 * self.adx_period, 2)
+
+    @property
+    def ready(self):
+        """
+        Whether every indicator, including the previous SMMA/EMA values, is defined.
+
+        Returns:
+            bool: True once warmup candles have been processed
+        """
+        return self.count >= self.warmup
+
+    def update(self, highs, lows, closes):
+        """
+        Advance every lane by one candle.
+
+        Parameters
+        ----------
+        highs, lows, closes : list
+            High, low and close price of the new candle, one value per lane
+
+        Returns
+        -------
+        None
+        """
+        t = self.count
+        self.count += 1
+        self._update_regression(t, closes)
+        self._update_smma(t, closes)
+        self._update_ema(t, closes)
+        self._update_bollinger(t, closes)
+        self._update_adx(t, highs, lows, closes)
+        self._prev = (highs, lows, closes)
+
+    def _update_regression(self, t, closes):
+        if self._models is not None:
+            for model, close in zip(self._models, closes):
+                model.update(close)
+            self.prediction = [model.predict(2) for model in self._models]
+            return
+        self._sum_y = [s + c for s, c in zip(self._sum_y, closes)]
+        self._sum_xy = [s + t * c for s, c in zip(self._sum_xy, closes)]
+        n = t + 1
+        sx = t * n // 2
+        dem = n * (t * n * (2 * t + 1) // 6) - sx * sx
+        if dem == 0:
+            return
+        slopes = [(n * sxy - sx * sy) / dem for sxy, sy in zip(self._sum_xy, self._sum_y)]
+        self.prediction = [a * (n + 1) + (sy - a * sx) / n for a, sy in zip(slopes, self._sum_y)]
+
+    def _update_smma(self, t, closes):
+        p = self.smma_period
+        if t < p:
+            self._smma_sum = [s + c for s, c in zip(self._smma_sum, closes)]
+            if t == p - 1:
+                self.smma = [s / p for s in self._smma_sum]
+            return
+        self.smma_prev = self.smma
+        self.smma = [(s * (p - 1) + c) / p for s, c in zip(self.smma, closes)]
+
+    def _update_ema(self, t, closes):
+        w = self.ema_period
+        if t < w:
+            self._ema_seed.append(closes)
+            if t == w - 1:
+                self._ema_state = [fsum(column) / w for column in zip(*self._ema_seed)]
+                self._ema_seed = []
+            return
+        k = 2 / (w + 1)
+        self.ema_prev = self.ema
+        self.ema = self._ema_state = [c * k + e * (1 - k) for c, e in zip(closes, self._ema_state)]
+
+    def _update_bollinger(self, t, closes):
+        p = self.bollinger_period
+        if t == 0:
+            self._offset = closes
+        shifted = [c - o for c, o in zip(closes, self._offset)]
+        self._sum = [s + x for s, x in zip(self._sum, shifted)]
+        self._sum_sq = [s + x * x for s, x in zip(self._sum_sq, shifted)]
+        slot = t % p
+        if t >= p:
+            old = self._ring[slot]
+            self._sum = [s - x for s, x in zip(self._sum, old)]
+            self._sum_sq = [s - x * x for s, x in zip(self._sum_sq, old)]
+        self._ring[slot] = shifted
+        if t < p - 1:
+            return
+        means = [s / p for s in self._sum]
+        self.std = [sqrt(max(sq / p - m * m, 0.0)) for sq, m in zip(self._sum_sq, means)]
+        deviations = [self.bollinger_deviation * d for d in self.std]
+        self.middle = [o + m for o, m in zip(self._offset, means)]
+        self.upper = [m + d for m, d in zip(self.middle, deviations)]
+        self.lower = [m - d for m, d in zip(self.middle, deviations)]
+
+    def _update_adx(self, t, highs, lows, closes):
+        if t == 0:
+            return
+        p = self.adx_period
+        prev_highs, prev_lows, prev_closes = self._prev
+        tr = [max(h - l, abs(h - pc), abs(l - pc)) for h, l, pc in zip(highs, lows, prev_closes)]
+        up = [h - ph for h, ph in zip(highs, prev_highs)]
+        down = [pl - l for l, pl in zip(lows, prev_lows)]
+        dm_plus = [max(u, 0) if u > d else 0 for u, d in zip(up, down)]
+        dm_minus = [0 if u > d else max(d, 0) for u, d in zip(up, down)]
+
+        j = t - 1
+        if j < p:
+            self._tr = [s + x for s, x in zip(self._tr, tr)]
+            self._dm_plus = [s + x for s, x in zip(self._dm_plus, dm_plus)]
+            self._dm_minus = [s + x for s, x in zip(self._dm_minus, dm_minus)]
+            if j < p - 1:
+                return
+            self._tr = [s / p for s in self._tr]
+            self._dm_plus = [s / p for s in self._dm_plus]
+            self._dm_minus = [s / p for s in self._dm_minus]
+        else:
+            self._tr = [(s * (p - 1) + x) / p for s, x in zip(self._tr, tr)]
+            self._dm_plus = [(s * (p - 1) + x) / p for s, x in zip(self._dm_plus, dm_plus)]
+            self._dm_minus = [(s * (p - 1) + x) / p for s, x in zip(self._dm_minus, dm_minus)]
+
+        self.di_plus = [(a / r) * 100 if r else 0.0 for a, r in zip(self._dm_plus, self._tr)]
+        self.di_minus = [(a / r) * 100 if r else 0.0 for a, r in zip(self._dm_minus, self._tr)]
+        dx = [(abs(a - b) / abs(a + b)) * 100 if a + b else 0.0 for a, b in zip(self.di_plus, self.di_minus)]
+
+        k = j - (p - 1)
+        if k < p:
+            self._dx = [s + x for s, x in zip(self._dx, dx)]
+            if k == p - 1:
+                self.adx = [s / p for s in self._dx]
+        else:
+            self.adx = [(s * (p - 1) + x) / p for s, x in zip(self.adx, dx)]
+
+    def signals(self, closes):
+        """
+        Evaluate the buy and sell rules of MarketData.buy_or_sell_signal on every lane.
+
+        Parameters
+        ----------
+        closes : list
+            Current close price of each lane
+
+        Returns
+        -------
+        tuple[list, list]
+            Buy and sell rule outcome (bool) of each lane
+        """
+        buys = [c > lo and dp > dm and pr > c and s > sp and e > ep
+                for c, lo, dp, dm, pr, s, sp, e, ep in zip(closes, self.lower, self.di_plus, self.di_minus,
+                                                          self.prediction, self.smma, self.smma_prev,
+                                                          self.ema, self.ema_prev)]
+        sells = [c < up and pr < c and dp < dm and s < sp and e < ep
+                 for c, up, dp, dm, pr, s, sp, e, ep in zip(closes, self.upper, self.di_plus, self.di_minus,
+                                                           self.prediction, self.smma, self.smma_prev,
+                                                           self.ema, self.ema_prev)]
+        return buys, sells
+
+    def keep(self, lanes):
+        """
+        Drop every lane not listed, keeping the state of the others.
+
+        Parameters
+        ----------
+        lanes : list
+            Indices of the lanes to keep, in their new order
+
+        Returns
+        -------
+        None
+        """
+        def pick(values):
+            return [values[i] for i in lanes]
+
+        for name in ('smma', 'smma_prev', 'ema', 'ema_prev', 'prediction', 'di_plus', 'di_minus', 'adx',
+                     'upper', 'middle', 'lower', 'std', '_sum_y', '_sum_xy', '_smma_sum', '_ema_state',
+                     '_tr', '_dm_plus', '_dm_minus', '_dx', '_offset', '_sum', '_sum_sq'):
+            setattr(self, name, pick(getattr(self, name)))
+        self._ema_seed = [pick(column) for column in self._ema_seed]
+        if self._models is not None:
+            self._models = pick(self._models)
+        self._ring = [None if column is None else pick(column) for column in self._ring]
+        if self._prev is not None:
+            self._prev = tuple(pick(column) for column in self._prev)
+        self.lanes = len(lanes)
@@ -0,0 +1,324 @@
+import argparse
+from bisect import bisect_left
+from itertools import product, zip_longest
+
+from .dataset import load_candles
+from . import streaming
+from .features import FeatureStore, digest
+from .streaming import StreamingIndicators
+
+PARAMETERS = ('smma_period', 'adx_period', 'bollinger_period', 'bollinger_deviation', 'take_profit', 'stop_loss')
+# columns computed together for each feature of the FeatureStore
+FEATURES = {
+    'trend': ('prediction', 'ema', 'ema_prev'),
+    'smma': ('smma', 'smma_prev'),
+    'adx': ('di_plus', 'di_minus'),
+    'bollinger': ('middle', 'std'),
+}
+
+
+def grid(smma_period=(50,), adx_period=(100,), bollinger_period=(20,), bollinger_deviation=(2,),
+         take_profit=(0.5,), stop_loss=(0.2,)):
+    """
+    Build the parameter matrix of every combination of the given values.
+
+    Returns:
+        list: One (smma_period, adx_period, bollinger_period, bollinger_deviation,
+            take_profit, stop_loss) row per combination
+
+    Example:
+        >>> len(grid(smma_period=(20, 50), take_profit=(0.1, 0.2, 0.5)))
+        6
+    """
+    return list(product(smma_period, adx_period, bollinger_period, bollinger_deviation, take_profit, stop_loss))
+
+
+def _bits(flags):
+    """Pack a list of booleans into an int whose bit t is flags[t]."""
+    return int(''.join('1' if flag else '0' for flag in reversed(flags)) or '0', 2)
+
+
+def _lowest_bit(mask, start):
+    """Index of the lowest set bit of mask at or after start, None if there is none."""
+    mask >>= start
+    if not mask:
+        return None
+    return start + (mask & -mask).bit_length() - 1
+
+
+class BatchEvaluator:
+    """Score many parameter sets of the trading rules on one dataset in a single pass.
+
+    The indicator series are computed once per distinct period with
+    StreamingIndicators. Each rule of MarketData.buy_or_sell_signal is then
+    turned into a bitmask over candles, once per distinct parameter value, and
+    the buy and sell series of a parameter row is the AND of its masks. Since a
+    game enters at most one position, each row is simulated from events: the
+    first decision is the lowest set bit of its signal masks, and the take
+    profit or stop loss exit is found by bisecting the running maximum and
+    minimum of the closes after entry. The results match Backtester on the
+    same candles.
+
+    Parameters
+    ----------
+    candles : dict
+        Columns of one pair, as returned by load_candles
+    dollars : float, optional
+        Initial stack of the quote currency (default is 1000)
+    coins : float, optional
+        Initial stack of the traded currency (default is 0)
+    fee_percent : float, optional
+        Transaction fee per order in percent (default is 0.2)
+    warmup : int, optional
+        Number of candles given before the first order is requested (default is 337)
+    store : FeatureStore, optional
+        Where indicator series are read from before computing them, and
+        written to after, keyed by the streaming.VERSION of the indicators;
+        by default they are kept in memory only
+
+    Examples
+    --------
+    >>> evaluator = BatchEvaluator(load_candles('datasets/test1.csv')['USDT_BTC'])
+    >>> results = evaluator.evaluate(grid(take_profit=(0.1, 0.5), stop_loss=(0.05, 0.2)))
+    """
+    def __init__(self, candles, dollars=1000, coins=0, fee_percent=0.2, warmup=337, store=None):
+        self.highs = candles['high']
+        self.lows = candles['low']
+        self.closes = candles['close']
+        self.dollars = float(dollars)
+        self.coins = float(coins)
+        self.fee = fee_percent / 100
+        self.warmup = warmup
+        self.series = {}
+        self.store = store
+        self.source = digest(candles) if store is not None else None
+
+    def compute_series(self, smma_periods, adx_periods, bollinger_periods):
+        """
+        Compute the indicator series needed for the given periods.
+
+        Periods already computed, or found in the store, are skipped. Several
+        distinct periods are computed in the same StreamingIndicators pass to
+        share the traversal, and each is saved to the store.
+
+        Parameters
+        ----------
+        smma_periods, adx_periods, bollinger_periods : iterable
+            Distinct periods of each indicator
+
+        Returns
+        -------
+        None
+            Series are stored in self.series under (name, period) keys, with
+            ('prediction', None) and ('ema', 50) for the fixed indicators
+        """
+        todo = [[p for p in periods if not self._restore(name, p)]
+                for name, periods in (('smma', smma_periods), ('adx', adx_periods), ('bollinger', bollinger_periods))]
+        if not self._restore('trend', None) and not any(todo):
+            todo = [[50], [], []]
+        for smma_period, adx_period, bollinger_period in zip_longest(*todo):
+            stream = StreamingIndicators(1, smma_period or 50, 50, adx_period or 100, bollinger_period or 20, 1)
+            record = {'prediction': [], 'ema': [], 'ema_prev': [], 'smma': [], 'smma_prev': [],
+                      'di_plus': [], 'di_minus': [], 'middle': [], 'std': []}
+            for candle in zip(self.highs, self.lows, self.closes):
+                stream.update(*([value] for value in candle))
+                for name, values in record.items():
+                    values.append(getattr(stream, name)[0])
+            self._keep('trend', None, record)
+            if smma_period is not None:
+                self._keep('smma', smma_period, record)
+            if adx_period is not None:
+                self._keep('adx', adx_period, record)
+            if bollinger_period is not None:
+                self._keep('bollinger', bollinger_period, record)
+
+    @staticmethod
+    def _key(column, period):
+        """Key of a column in self.series; the trend columns are not keyed by a period."""
+        return {'prediction': None, 'ema': 50, 'ema_prev': 50}.get(column, period)
+
+    @staticmethod
+    def _parameters(name, period):
+        """Parameters a feature depends on, as stored in the FeatureStore, with the version of the indicators."""
+        if name == 'trend':
+            return {'ema_period': 50, 'predictor': 'regression', 'version': streaming.VERSION}
+        return {'period': period, 'version': streaming.VERSION}
+
+    def _restore(self, name, period):
+        """Make the columns of a feature available from memory or the store, False if they must be computed."""
+        columns = FEATURES[name]
+        if (columns[0], self._key(columns[0], period)) in self.series:
+            return True
+        if self.store is None:
+            return False
+        stored = self.store.load(self.source, name, self._parameters(name, period))
+        if stored is None or any(column not in stored for column in columns):
+            return False
+        for column in columns:
+            self.series[(column, self._key(column, period))] = stored[column]
+        return True
+
+    def _keep(self, name, period, record):
+        """Store the columns of a feature computed in a pass, unless it is already known."""
+        columns = FEATURES[name]
+        if (columns[0], self._key(columns[0], period)) in self.series:
+            return
+        for column in columns:
+            self.series[(column, self._key(column, period))] = record[column]
+        if self.store is not None:
+            self.store.save(self.source, name, self._parameters(name, period),
+                            {column: record[column] for column in columns})
+
+    def _masks(self, parameters):
+        closes = self.closes
+        series = self.series
+        masks = {}
+
+        prediction = series[('prediction', None)]
+        ema, ema_prev = series[('ema', 50)], series[('ema_prev', 50)]
+        masks['trend'] = (_bits([p > c for p, c in zip(prediction, closes)])
+                          & _bits([e > ep for e, ep in zip(ema, ema_prev)]),
+                          _bits([p < c for p, c in zip(prediction, closes)])
+                          & _bits([e < ep for e, ep in zip(ema, ema_prev)]))
+        for period in {row[0] for row in parameters}:
+            smma, smma_prev = series[('smma', period)], series[('smma_prev', period)]
+            masks['smma', period] = (_bits([s > sp for s, sp in zip(smma, smma_prev)]),
+                                     _bits([s < sp for s, sp in zip(smma, smma_prev)]))
+        for period in {row[1] for row in parameters}:
+            di_plus, di_minus = series[('di_plus', period)], series[('di_minus', period)]
+            masks['adx', period] = (_bits([p > m for p, m in zip(di_plus, di_minus)]),
+                                    _bits([p < m for p, m in zip(di_plus, di_minus)]))
+        for period, deviation in {(row[2], row[3]) for row in parameters}:
+            middle, std = series[('middle', period)], series[('std', period)]
+            masks['bollinger', period, deviation] = (
+                _bits([c > m - deviation * s for c, m, s in zip(closes, middle, std)]),
+                _bits([c < m + deviation * s for c, m, s in zip(closes, middle, std)]))
+        return masks
+
+    def _equity_path(self, start, end, dollars, coins, peak, drawdown):
+        """Running peak and drawdown of a constant-stack equity path, as in Backtester.step."""
+        peaks, drawdowns = [], []
+        for price in self.closes[start:end]:
+            equity = dollars + coins * price
+            if equity > peak:
+                peak = equity
+            elif peak > 0 and 1 - equity / peak > drawdown:
+                drawdown = 1 - equity / peak
+            peaks.append(peak)
+            drawdowns.append(drawdown)
+        return peaks, drawdowns
+
+    @staticmethod
+    def _settle(peak, drawdown, equity):
+        """Drawdown after the equity moves to a constant value."""
+        if peak > 0 and equity < peak:
+            return max(drawdown, 1 - equity / peak)
+        return drawdown
+
+    def evaluate(self, parameters):
+        """
+        Simulate one game per parameter row.
+
+        Parameters
+        ----------
+        parameters : list
+            Rows of (smma_period, adx_period, bollinger_period, bollinger_deviation,
+            take_profit, stop_loss), e.g. from grid()
+
+        Returns
+        -------
+        list
+            (total return, maximum drawdown) for each row, in order
+        """
+        closes = self.closes
+        n = len(closes)
+        fee = self.fee
+        self.compute_series({row[0] for row in parameters}, {row[1] for row in parameters},
+                            {row[2] for row in parameters})
+        masks = self._masks(parameters)
+        initial = self.dollars + self.coins * closes[0]
+        pre_peaks, pre_drawdowns = self._equity_path(0, n, self.dollars, self.coins, initial, 0.0)
+
+        def before(t):
+            return (pre_peaks[t - 1], pre_drawdowns[t - 1]) if t > 0 else (initial, 0.0)
+
+        events = {}
+        results = [None] * len(parameters)
+        for index, row in enumerate(parameters):
+            smma_period, adx_period, bollinger_period, deviation = row[:4]
+            ready = StreamingIndicators(0, smma_period, 50, adx_period, bollinger_period).warmup
+            start = max(self.warmup, ready) - 1
+            if start >= n:
+                results[index] = (pre_peaks[-1], pre_drawdowns[-1], self.dollars + self.coins * closes[-1])
+                continue
+            if self.coins == 0:
+                events.setdefault(start, []).append(index)
+                continue
+            parts = (masks['trend'], masks['smma', smma_period], masks['adx', adx_period],
+                     masks['bollinger', bollinger_period, deviation])
+            buy = parts[0][0] & parts[1][0] & parts[2][0] & parts[3][0]
+            sell = parts[0][1] & parts[1][1] & parts[2][1] & parts[3][1]
+            t = _lowest_bit(buy | sell, start)
+            if t is None:
+                results[index] = (pre_peaks[-1], pre_drawdowns[-1], self.dollars + self.coins * closes[-1])
+            elif buy >> t & 1:
+                events.setdefault(t, []).append(index)
+            else:
+                peak, drawdown = before(t)
+                dollars = self.dollars + self.coins * closes[t] * (1 - fee)
+                results[index] = (peak, self._settle(peak, drawdown, dollars), dollars)
+
+        for t, rows in events.items():
+            price = closes[t]
+            amount = self.dollars / price
+            coins = self.coins + amount * (1 - fee)
+            dollars = self.dollars - amount * price
+            peak, drawdown = before(t)
+            peaks, drawdowns = self._equity_path(t, n, dollars, coins, peak, drawdown)
+            highest, lowest = [], []
+            for close in closes[t + 1:]:
+                highest.append(max(close, highest[-1]) if highest else close)
+                lowest.append(-min(close, -lowest[-1]) if lowest else -close)
+            for index in rows:
+                take_profit, stop_loss = parameters[index][4:]
+                exit_high = price * (1 + take_profit)
+                exit_low = price * (1 - stop_loss)
+                exit = min(bisect_left(highest, exit_high), bisect_left(lowest, -exit_low))
+                if exit == len(highest):
+                    results[index] = (peaks[-1], drawdowns[-1], dollars + coins * closes[-1])
+                    continue
+                # peaks/drawdowns start at candle t, the exit candle is t + 1 + exit
+                peak, drawdown = peaks[exit], drawdowns[exit]
+                final = dollars + coins * closes[t + 1 + exit] * (1 - fee)
+                results[index] = (peak, self._settle(peak, drawdown, final), final)
+
+        return [(final / initial - 1, drawdown) for _, drawdown, final in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a grid of strategy parameters on one dataset")
+    parser.add_argument('dataset', help="CSV dataset to evaluate on")
+    parser.add_argument('--smma', type=int, nargs='+', default=[50])
+    parser.add_argument('--adx', type=int, nargs='+', default=[100])
+    parser.add_argument('--bollinger', type=int, nargs='+', default=[20])
+    parser.add_argument('--deviation', type=float, nargs='+', default=[2])
+    parser.add_argument('--take-profit', type=float, nargs='+', default=[0.5])
+    parser.add_argument('--stop-loss', type=float, nargs='+', default=[0.2])
+    parser.add_argument('--coins', type=float, default=0)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--features', default='.features', help="feature store directory of the indicator series")
+    parser.add_argument('--no-features', action='store_true', help="compute every indicator series")
+    args = parser.parse_args()
+
+    store = None if args.no_features else FeatureStore(args.features)
+    parameters = grid(args.smma, args.adx, args.bollinger, args.deviation, args.take_profit, args.stop_loss)
+    for pair, candles in load_candles(args.dataset).items():
+        results = BatchEvaluator(candles, coins=args.coins, store=store).evaluate(parameters)
+        ranking = sorted(zip(results, parameters), key=lambda item: item[0][0], reverse=True)
+        for (total, drawdown), row in ranking[:args.top]:
+            settings = ' '.join(f'{name}={value}' for name, value in zip(PARAMETERS, row))
+            print(f'{pair} return={total:.4f} drawdown={drawdown:.4f} {settings}')
+
+
+if __name__ == '__main__':
+    main()
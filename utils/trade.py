@@ -1,5 +1,6 @@
 from .setting import Settings
 from .debug import Debugger
+from .bus import CandleBus
 
 class Trader:
     """A class that handles trading operations and market decisions.
@@ -11,16 +12,28 @@ class Trader:
         bot_settings (Settings): Configuration and settings for the trading bot.
         prices (dict): Dictionary tracking buy and sell prices with list values.
         debug (Debugger): Debugger instance for logging and debugging purposes.
+        bus (CandleBus): Bus running the strategy in worker processes, None to run it in process.
+
+    Args:
+        output (file, optional): Stream receiving the bot orders, standard output if None.
+        predictor (str, optional): Price predictor of the signals: 'regression', 'rls' or 'kalman'.
+        workers (int, optional): Number of strategy worker processes fed through a CandleBus,
+            0 to decide in this process (default is 0).
 
     Methods:
         run(): Main loop that continuously processes user input commands.
         parse(command: str): Parses and processes input commands to update settings or make trades.
         make_decision(): Analyzes market data and makes trading decisions for each currency pair.
     """
-    def __init__(self):
+    def __init__(self, output=None, predictor='regression', workers=0):
         self.bot_settings = Settings()
+        self.bot_settings.market_data.output = output
+        self.bot_settings.market_data.predictor = predictor
         self.prices = {'sell': [], 'buy': []}
         self.debug = Debugger()
+        self.output = output
+        self.bus = CandleBus(workers, predictor=predictor) if workers else None
+        self.bot_settings.bus = self.bus
 
     def run(self):
         """
@@ -41,13 +54,17 @@ class Trader:
         Returns:
             None
         """
-        while True:
-            try:
-                command = input().strip()
-                if command:
-                    self.parse(command)
-            except EOFError:
-                break
+        try:
+            while True:
+                try:
+                    command = input().strip()
+                    if command:
+                        self.parse(command)
+                except EOFError:
+                    break
+        finally:
+            if self.bus is not None:
+                self.bus.close()
 
     def parse(self, command):
         """
@@ -94,15 +111,28 @@ class Trader:
             None
 
         Side Effects:
-            - Updates trading signals through market_data's buy_or_sell_signal method
+            - Updates trading signals through market_data's buy_or_sell_signal method,
+              or through the strategy workers of the bus when there is one
             - Logs asset values through debug printer
         """
+        if self.bus is not None:
+            requests = []
+            for pair, ring in self.bus.rings.items():
+                requests.append((pair, *self._stacks(pair, ring.last()[4])))
+            for orders in self.bus.decide(requests):
+                print(orders, end='', file=self.output, flush=True)
+            return
+
         for pair, data in self.bot_settings.market_data.data.items():
             closing_prices = data['close']
             if closing_prices:
-                base_currency, quote_currency = pair.split('_')
-                dollars = self.bot_settings.stack.get(base_currency, 0)
-                sell_fig = self.bot_settings.stack.get(quote_currency, 0)
-                asset = dollars + (sell_fig * closing_prices[-1])
-                self.debug.print(f"Total Assets: ${asset:.2f} 💰")
+                dollars, sell_fig, asset = self._stacks(pair, closing_prices[-1])
                 self.bot_settings.market_data.buy_or_sell_signal(pair, dollars, sell_fig, asset)
+
+    def _stacks(self, pair, close):
+        base_currency, quote_currency = pair.split('_')
+        dollars = self.bot_settings.stack.get(base_currency, 0)
+        sell_fig = self.bot_settings.stack.get(quote_currency, 0)
+        asset = dollars + (sell_fig * close)
+        self.debug.print(f"Total Assets: ${asset:.2f} 💰")
+        return dollars, sell_fig, asset